@@ -5,6 +5,9 @@ from django.utils.translation import gettext_lazy as _
 class User(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # Resized copies of avatar, rendered by conf/images.py
+    avatar_thumbnail = models.ImageField(null=True, blank=True, editable=False)
+    avatar_medium = models.ImageField(null=True, blank=True, editable=False)
     is_author = models.BooleanField(default=False)
     following = models.ManyToManyField(
         'self', 
@@ -12,6 +15,12 @@ class User(AbstractUser):
         related_name='followers',
         symmetrical=False
     )
+    # Maintained with F() updates by the follow views, the Story signals in
+    # stories/signals.py and accounts/signals.py when a user is deleted. Run
+    # reconcile_counters to backfill rows that predate the columns.
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    stories_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.username
@@ -31,6 +40,10 @@ class UserFollow(models.Model):
 
     class Meta:
         unique_together = ('follower', 'following')
+        indexes = [
+            models.Index(fields=['following', '-created_at', '-id'], name='follow_following_created_idx'),
+            models.Index(fields=['follower', '-created_at', '-id'], name='follow_follower_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
@@ -0,0 +1,8 @@
+from conf.pagination import KeysetCursorPagination
+
+
+class FollowCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over follow relationships, most recent first"""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from conf.images import ImageVariantField
+
 from .models import UserFollow
 
 User = get_user_model()
@@ -27,34 +29,28 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-    stories_count = serializers.SerializerMethodField()
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+    stories_count = serializers.IntegerField(read_only=True)
     is_following = serializers.SerializerMethodField()
     avatar = serializers.ImageField(required=False, allow_null=True)
+    avatar_thumbnail = ImageVariantField('avatar_thumbnail', 'avatar')
+    avatar_medium = ImageVariantField('avatar_medium', 'avatar')
 
     class Meta:
         model = User
         fields = (
             'id', 'username', 'email', 'first_name', 'last_name',
             'date_joined', 'followers_count', 'following_count',
-            'stories_count', 'is_following', 'bio', 'avatar', 'is_author'
+            'stories_count', 'is_following', 'bio', 'avatar',
+            'avatar_thumbnail', 'avatar_medium', 'is_author'
         )
         read_only_fields = ('id', 'username', 'email', 'date_joined')
 
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-
-    def get_following_count(self, obj):
-        return obj.following.count()
-
-    def get_stories_count(self, obj):
-        return obj.stories.count()
-
     def get_is_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            if request.user == obj:
+            if request.user.pk == obj.pk:
                 return None  # Don't show follow status for own profile
             return UserFollow.objects.filter(
                 follower=request.user,
@@ -0,0 +1,30 @@
+from django.db.models import F
+from django.db.models.signals import post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from conf import images
+
+from .models import User
+
+images.register(User, 'avatar', {
+    'avatar_thumbnail': (96, 96),
+    'avatar_medium': (320, 320),
+})
+post_init.connect(images.remember_source, sender=User)
+post_save.connect(images.queue_variants, sender=User)
+
+
+@receiver(pre_delete, sender=User)
+def release_follow_counters(sender, instance, **kwargs):
+    """Take a deleted user's follows off the counters of the users they touch
+
+    The cascade removes the UserFollow rows without going through the
+    unfollow view, so the other side of each is decremented here, one
+    UPDATE per direction.
+    """
+    User.objects.filter(follower_relationships__follower=instance).update(
+        followers_count=F('followers_count') - 1
+    )
+    User.objects.filter(following_relationships__following=instance).update(
+        following_count=F('following_count') - 1
+    )
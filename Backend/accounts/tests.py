@@ -1,3 +1,156 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from stories.models import Story
+
+from .models import UserFollow
+
+User = get_user_model()
+
+
+class FollowCounterTests(TestCase):
+    """Follower/following/story counters are stored on the user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.client.force_authenticate(self.reader)
+
+    def test_follow_and_unfollow_update_counters(self):
+        self.client.post(f'/api/follow/{self.author.username}/')
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (1, 1))
+
+        self.client.post(f'/api/unfollow/{self.author.username}/')
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (0, 0))
+
+    def test_repeated_unfollow_leaves_counters_alone(self):
+        self.client.post(f'/api/follow/{self.author.username}/')
+        self.client.post(f'/api/unfollow/{self.author.username}/')
+        response = self.client.post(f'/api/unfollow/{self.author.username}/')
+
+        self.assertEqual(response.status_code, 400)
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.reader.following_count), (0, 0))
+
+    def test_deleting_a_user_releases_their_follows(self):
+        self.client.post(f'/api/follow/{self.author.username}/')
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        self.client.force_authenticate(self.author)
+        self.client.post(f'/api/follow/{fan.username}/')
+
+        self.reader.delete()
+        self.author.refresh_from_db()
+        self.assertEqual((self.author.followers_count, self.author.following_count), (0, 1))
+
+        self.author.delete()
+        fan.refresh_from_db()
+        self.assertEqual(fan.followers_count, 0)
+
+        output = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=output)
+        self.assertNotIn('drifted', output.getvalue())
+
+    def test_story_create_and_delete_update_stories_count(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post('/api/stories/', {
+            'title': 'Counted', 'description': 'd', 'content': 'c'
+        }, format='json')
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.stories_count, 1)
+
+        self.client.delete(f"/api/stories/{response.data['slug']}/")
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.stories_count, 0)
+
+    def test_stories_created_outside_the_api_are_counted(self):
+        story = Story.objects.create(title='Seeded', description='d', content='c', author=self.author)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.stories_count, 1)
+
+        # A row from before the counter existed reads 0 until reconciled
+        User.objects.filter(pk=self.author.pk).update(stories_count=0)
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/stories/{story.slug}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.stories_count, 0)
+
+    def test_profile_reads_stored_counters(self):
+        UserFollow.objects.create(follower=self.reader, following=self.author)
+
+        # profile row, is_following
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/profile/{self.author.username}/')
+        self.assertTrue(response.data['is_following'])
+
+
+class FollowStateTests(TestCase):
+    """Follow state for many users comes back from one request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}', password='testpass123') for i in range(5)
+        ]
+        UserFollow.objects.create(follower=self.reader, following=self.authors[0])
+        self.client.force_authenticate(self.reader)
+
+    def test_batch_lookup_uses_constant_queries(self):
+        usernames = [author.username for author in self.authors] + ['reader', 'missing']
+
+        # users, follow edges
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/follow-state/', {'usernames': usernames}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['author0']['is_following'])
+        self.assertFalse(response.data['author1']['is_following'])
+        self.assertIsNone(response.data['reader']['is_following'])
+        self.assertNotIn('missing', response.data)
+
+    def test_rejects_oversized_batches(self):
+        usernames = ','.join(f'user{i}' for i in range(101))
+        response = self.client.get('/api/follow-state/', {'usernames': usernames})
+        self.assertEqual(response.status_code, 400)
+
+
+class AvatarVariantTests(TestCase):
+    """Uploaded avatars get resized variants"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_avatar_variants_are_rendered(self):
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), 'teal').save(buffer, format='PNG')
+        user = User.objects.create_user(username='pictured', password='testpass123')
+        user.avatar = SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+        user.save()
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+        user.refresh_from_db()
+
+        with Image.open(user.avatar_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (96, 72))
+        with Image.open(user.avatar_medium.path) as medium:
+            self.assertEqual(medium.size, (320, 240))
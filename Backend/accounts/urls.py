@@ -15,4 +15,5 @@ urlpatterns = [
     # Follow system
     path('follow/<str:username>/', views.FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<str:username>/', views.UnfollowUserView.as_view(), name='unfollow-user'),
+    path('follow-state/', views.FollowStateView.as_view(), name='follow-state'),
 ]
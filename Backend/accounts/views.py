@@ -6,7 +6,10 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import make_password
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import F
 from .models import UserFollow
+from .pagination import FollowCursorPagination
 from .serializers import UserSerializer, UserProfileSerializer, UserFollowSerializer
 
 User = get_user_model()
@@ -151,10 +154,14 @@ class FollowUserView(APIView):
                 )
 
             # Check if already following
-            follow, created = UserFollow.objects.get_or_create(
-                follower=request.user,
-                following=user_to_follow
-            )
+            with transaction.atomic():
+                follow, created = UserFollow.objects.get_or_create(
+                    follower=request.user,
+                    following=user_to_follow
+                )
+                if created:
+                    User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') + 1)
+                    User.objects.filter(pk=user_to_follow.pk).update(followers_count=F('followers_count') + 1)
 
             if not created:
                 return Response(
@@ -183,18 +190,23 @@ class UnfollowUserView(APIView):
         try:
             user_to_unfollow = get_object_or_404(User, username=username, is_active=True)
 
-            follow = UserFollow.objects.filter(
-                follower=request.user,
-                following=user_to_unfollow
-            ).first()
-
-            if not follow:
+            # Only the request whose delete removed the row moves the
+            # counters, so concurrent unfollows can't decrement twice
+            with transaction.atomic():
+                deleted, _ = UserFollow.objects.filter(
+                    follower=request.user,
+                    following=user_to_unfollow
+                ).delete()
+                if deleted:
+                    User.objects.filter(pk=request.user.pk).update(following_count=F('following_count') - 1)
+                    User.objects.filter(pk=user_to_unfollow.pk).update(followers_count=F('followers_count') - 1)
+
+            if not deleted:
                 return Response(
                     {'error': 'You are not following this user'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            follow.delete()
             return Response(
                 {
                     'message': f'You have unfollowed {user_to_unfollow.username}',
@@ -208,22 +220,92 @@ class UnfollowUserView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class FollowStateView(APIView):
+    """Follow state and counts for a batch of users
+
+    Accepts `?usernames=a,b,c` on GET or `{"usernames": [...]}` on POST and
+    answers in two queries however many usernames are asked for.
+    """
+    permission_classes = [permissions.AllowAny]
+    max_usernames = 100
+
+    def get(self, request):
+        usernames = request.query_params.get('usernames', '').split(',')
+        return self.follow_state(request, usernames)
+
+    def post(self, request):
+        usernames = request.data.get('usernames', [])
+        if not isinstance(usernames, list):
+            return Response(
+                {'error': 'usernames must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.follow_state(request, usernames)
+
+    def follow_state(self, request, usernames):
+        usernames = list(dict.fromkeys(str(name).strip() for name in usernames if str(name).strip()))
+        if not usernames:
+            return Response(
+                {'error': 'At least one username is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(usernames) > self.max_usernames:
+            return Response(
+                {'error': f'At most {self.max_usernames} usernames can be requested at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        users = list(
+            User.objects.filter(username__in=usernames, is_active=True).only(
+                'id', 'username', 'followers_count', 'following_count', 'stories_count'
+            )
+        )
+
+        following_ids = set()
+        if request.user.is_authenticated:
+            following_ids = set(
+                UserFollow.objects.filter(
+                    follower=request.user,
+                    following__in=[user.pk for user in users]
+                ).values_list('following_id', flat=True)
+            )
+
+        def is_following(user):
+            if not request.user.is_authenticated:
+                return False
+            if user.pk == request.user.pk:
+                return None  # Don't show follow status for own profile
+            return user.pk in following_ids
+
+        return Response({
+            user.username: {
+                'id': user.pk,
+                'is_following': is_following(user),
+                'followers_count': user.followers_count,
+                'following_count': user.following_count,
+                'stories_count': user.stories_count,
+            }
+            for user in users
+        })
+
 class UserFollowersView(generics.ListAPIView):
     """Get user's followers"""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserFollowSerializer
+    pagination_class = FollowCursorPagination
 
     def get_queryset(self):
         username = self.kwargs['username']
         user = get_object_or_404(User, username=username, is_active=True)
-        return UserFollow.objects.filter(following=user)
+        return UserFollow.objects.filter(following=user).select_related('follower', 'following')
 
 class UserFollowingView(generics.ListAPIView):
     """Get users that a user is following"""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = UserFollowSerializer
+    pagination_class = FollowCursorPagination
 
     def get_queryset(self):
         username = self.kwargs['username']
         user = get_object_or_404(User, username=username, is_active=True)
-        return UserFollow.objects.filter(follower=user)
\ No newline at end of file
+        return UserFollow.objects.filter(follower=user).select_related('follower', 'following')
\ No newline at end of file
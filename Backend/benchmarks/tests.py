@@ -0,0 +1,200 @@
+"""
+Query budgets for every API route, measured against a synthetic dataset.
+
+Each entry in ``ROUTES`` becomes its own test, so writes made by one
+benchmark are rolled back before the next. A benchmark fails when its
+request returns an unexpected status or issues more queries than its
+budget. Budgets are independent of the dataset size: a route whose query
+count grows with the data is an N+1 regression. Side effects are queued
+as jobs rather than run, as they are in production, so a route's budget
+counts the job rows it inserts but not the work they do.
+
+Wall time and response size are recorded alongside the query counts and
+written as a table to the file named by ``BENCHMARK_REPORT``;
+``BENCHMARK_SCALE`` multiplies the number of synthetic rows. The default
+dataset has 500 stories to keep the test suite quick; since budgets don't
+depend on size, that is enough to catch regressions, and a scale of 4 or
+more gives the thousands of stories a realistic load test calls for::
+
+    BENCHMARK_SCALE=5 BENCHMARK_REPORT=bench_output.txt python manage.py test benchmarks
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from rest_framework.test import APIClient
+
+from accounts import urls as account_urls
+from stories import dataset, urls as story_urls
+
+SCALE = int(os.environ.get('BENCHMARK_SCALE', 1))
+REPORT = os.environ.get('BENCHMARK_REPORT')
+
+
+@dataclass
+class Route:
+    name: str
+    method: str
+    budget: int
+    url_kwargs: Callable = lambda data: {}
+    # 'reader', 'author', or None for an anonymous request
+    user: Optional[str] = 'reader'
+    body: Callable = lambda data: None
+    query: dict = field(default_factory=dict)
+    status: int = 200
+    # Distinguishes several benchmarks of the same route
+    label: str = ''
+
+    @property
+    def key(self):
+        return '_'.join(filter(None, [self.name.replace('-', '_'), self.method, self.label]))
+
+
+def story(data):
+    return {'slug': data.story.slug}
+
+
+def story_slug(data):
+    return {'story_slug': data.story.slug}
+
+
+def chapter(data):
+    return {'story_slug': data.story.slug, 'pk': data.chapter.pk}
+
+
+def chapter_pk(data):
+    return {'story_slug': data.story.slug, 'chapter_pk': data.chapter.pk}
+
+
+def decision_point(data):
+    return {**chapter_pk(data), 'pk': data.decision_point.pk}
+
+
+def decision_point_pk(data):
+    return {**chapter_pk(data), 'decision_point_pk': data.decision_point.pk}
+
+
+def author(data):
+    return {'username': data.author.username}
+
+
+ROUTES = [
+    # Stories
+    Route('story-list', 'get', 1, user=None, label='anonymous'),
+    Route('story-list', 'get', 3),
+    Route('story-list', 'get', 3, query={'search': 'dragons'}, label='search'),
+    # The slug is claimed by the insert itself, inside a savepoint (two statements)
+    Route('story-list', 'post', 12, user='author', status=201,
+          body=lambda data: {'title': 'Benchmark', 'description': 'd', 'content': 'c'}),
+    # Feed entry keys, read-time authors, stories by pk, liked and shared ids
+    Route('story-feed', 'get', 5),
+    Route('story-trending', 'get', 2, user=None),
+    Route('story-search', 'get', 4, query={'q': 'dragons'}),
+    Route('story-detail', 'get', 7, story),
+    Route('story-detail', 'patch', 13, story, user='author', body=lambda data: {'title': 'Renamed'}),
+    Route('story-detail', 'delete', 21, story, user='author', status=204),
+    Route('story-tree', 'get', 4, story),
+    Route('story-like', 'put', 6, story),
+    Route('story-like', 'delete', 5, story),
+    Route('story-like', 'post', 6, story),
+    Route('story-share', 'post', 10, story, status=201, body=lambda data: {'platform': 'email'}),
+    Route('story-stats', 'get', 6, story, user='author'),
+    Route('story-shares', 'get', 2, story, user='author'),
+    Route('user-stories', 'get', 3, author),
+
+    # Chapters, decision points, choices and votes
+    Route('chapter-list', 'get', 5, story_slug),
+    Route('chapter-list', 'post', 8, story_slug, user='author', status=201,
+          body=lambda data: {'title': 'Epilogue', 'content': 'The end.', 'order': 1000}),
+    # Moves the benchmark chapter to the end and inserts a new one in its place
+    Route('chapter-bulk', 'post', 13, story_slug, user='author', body=lambda data: {'chapters': [
+        {'id': data.chapter.pk, 'order': 1000},
+        {'title': 'Prologue', 'content': 'Before it all.', 'order': data.chapter.order},
+    ]}),
+    Route('chapter-detail', 'get', 4, chapter),
+    Route('chapter-content', 'get', 2, chapter),
+    Route('decision-point-list', 'get', 3, chapter_pk),
+    Route('decision-point-list', 'post', 7, chapter_pk, user='author', status=201,
+          body=lambda data: {'question': 'Where next?'}),
+    Route('decision-point-detail', 'get', 2, decision_point),
+    Route('choice-list', 'get', 2, decision_point_pk),
+    Route('choice-list', 'post', 7, decision_point_pk, user='author', status=201,
+          body=lambda data: {'text': 'Turn back'}),
+    Route('vote-create', 'post', 7, decision_point_pk, status=201,
+          body=lambda data: {'choice': data.choice.pk}),
+
+    # Accounts
+    Route('current-user', 'get', 0),
+    Route('profile', 'get', 0),
+    Route('profile-update', 'patch', 1, body=lambda data: {'bio': 'Reads everything'}),
+    Route('user-profile', 'get', 2, author),
+    Route('user-followers', 'get', 2, author),
+    Route('user-following', 'get', 2, lambda data: {'username': data.reader.username}),
+    Route('follow-user', 'post', 10, lambda data: {'username': data.stranger.username}, status=201),
+    Route('unfollow-user', 'post', 8, author),
+    Route('follow-state', 'get', 2, query={'usernames': 'user0,user1,user2,user3,user4,missing'}),
+]
+
+
+class EndpointBenchmarks(TestCase):
+    """Every API route stays within its query budget on a realistic dataset"""
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = dataset.build(scale=SCALE)
+
+    @classmethod
+    def tearDownClass(cls):
+        if REPORT and cls.results:
+            with open(REPORT, 'w') as report:
+                report.write(f"{'route':<40} {'queries':>8} {'budget':>7} {'ms':>9} {'bytes':>9}\n")
+                for key, queries, budget, elapsed, size in sorted(cls.results):
+                    report.write(f"{key:<40} {queries:>8} {budget:>7} {elapsed * 1000:>9.1f} {size:>9}\n")
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def measure(self, route):
+        client = APIClient()
+        if route.user:
+            client.force_authenticate(getattr(self.data, route.user))
+        url = reverse(route.name, kwargs=route.url_kwargs(self.data))
+        request = getattr(client, route.method)
+        if route.method == 'get':
+            arguments = {'data': route.query}
+        else:
+            arguments = {'data': route.body(self.data), 'format': 'json'}
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request(url, **arguments)
+            elapsed = time.perf_counter() - start
+
+        self.results.append((route.key, len(queries), route.budget, elapsed, len(response.content)))
+        self.assertEqual(response.status_code, route.status, response.content[:500])
+        self.assertLessEqual(
+            len(queries), route.budget,
+            f"{route.key} issued {len(queries)} queries, over its budget of {route.budget}:\n"
+            + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_every_route_is_benchmarked(self):
+        names = {
+            pattern.name
+            for module in (story_urls, account_urls)
+            for pattern in module.urlpatterns
+            if isinstance(pattern, URLPattern)
+        }
+        self.assertEqual(names - {route.name for route in ROUTES}, set())
+
+
+for _route in ROUTES:
+    setattr(EndpointBenchmarks, f'test_{_route.key}', lambda self, route=_route: self.measure(route))
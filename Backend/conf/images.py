@@ -0,0 +1,164 @@
+"""
+Resized variants of uploaded images, such as story covers and user avatars.
+
+Apps ``register()`` a model's source field and variant fields, and connect
+``remember_source`` and ``queue_variants`` to its ``post_init`` and
+``post_save`` signals. Uploads are stored as-is. When the source changes,
+the row's variant fields are cleared, their files deleted on commit, and an
+``images.render_variants`` job is queued. The job renders each variant to fit its bounding box,
+encodes it as ``FORMAT`` (WebP by default, JPEG for older clients), saves it
+next to the original and writes the names back with a single ``UPDATE``.
+Serializers expose the variant that fits where the image is shown with
+``ImageVariantField``, falling back to the original until it has been
+rendered.
+"""
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from jobs.queue import task
+
+DEFAULTS = {
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+# model -> (source field, {variant field: bounding box}, on_render)
+VARIANTS = {}
+
+
+def register(model, source_field, variants, on_render=None):
+    """Render ``variants`` of ``model``'s ``source_field`` whenever it changes
+
+    ``on_render`` is called with the row's pk once its variants are saved.
+    """
+    VARIANTS[model] = (source_field, variants, on_render)
+
+
+def image_settings():
+    return {**DEFAULTS, **getattr(settings, 'STORIES_IMAGES', {})}
+
+
+def loaded_source(instance):
+    """Return the source image name on ``instance``, or None if it isn't loaded
+
+    Reads through ``__dict__`` so a deferred field is never fetched.
+    """
+    source_field = VARIANTS[type(instance)][0]
+    value = instance.__dict__.get(source_field)
+    return getattr(value, 'name', value) or None
+
+
+def reset_variants(instance):
+    """Clear the variants of ``instance``; returns the source name to render, if any
+
+    The replaced variant files are deleted once the transaction commits.
+    """
+    model = type(instance)
+    source_field, variants, _ = VARIANTS[model]
+    rows = model.objects.filter(pk=instance.pk)
+
+    # Read from the table: the render job writes names the instance never saw
+    stale = [name for name in rows.values_list(*variants).first() or () if name]
+    rows.update(**{field: None for field in variants})
+    for field in variants:
+        setattr(instance, field, None)
+    if stale:
+        storage = model._meta.get_field(source_field).storage
+        transaction.on_commit(lambda: delete_files(storage, stale))
+    return getattr(instance, source_field).name or None
+
+
+def delete_files(storage, names):
+    for name in names:
+        storage.delete(name)
+
+
+def render_variants(model, pk, source_name):
+    """Render and record every variant of one upload; returns {field: name}"""
+    source_field, variants, on_render = VARIANTS[model]
+    storage = model._meta.get_field(source_field).storage
+    options = image_settings()
+    image_format = options['FORMAT']
+
+    with storage.open(source_name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    stem = posixpath.splitext(source_name)[0]
+    names = {}
+    for field, size in variants.items():
+        variant = image.copy()
+        variant.thumbnail(size, Image.LANCZOS)
+        if image_format == 'JPEG':
+            variant = variant.convert('RGB')
+        elif variant.mode not in ('RGB', 'RGBA'):
+            variant = variant.convert('RGBA')
+        buffer = BytesIO()
+        variant.save(buffer, format=image_format, quality=options['QUALITY'])
+        suffix = field.rsplit('_', 1)[-1]
+        names[field] = storage.save(
+            f'{stem}_{suffix}.{EXTENSIONS[image_format]}', ContentFile(buffer.getvalue())
+        )
+
+    # Skip the write if the upload was replaced while this one rendered
+    if not model.objects.filter(pk=pk, **{source_field: source_name}).update(**names):
+        delete_files(storage, names.values())
+        return {}
+
+    if on_render is not None:
+        on_render(pk)
+    return names
+
+
+@task('images.render_variants')
+def render_image_variants(model_label, pk, source_name):
+    render_variants(apps.get_model(model_label), pk, source_name)
+
+
+def remember_source(sender, instance, **kwargs):
+    """``post_init`` receiver noting the source image the row was loaded with"""
+    instance._image_source = loaded_source(instance)
+
+
+def queue_variants(sender, instance, raw=False, **kwargs):
+    """``post_save`` receiver queueing new variants when the source changed"""
+    source_field = VARIANTS[sender][0]
+    # A deferred source that was never assigned can't have changed
+    if raw or source_field not in instance.__dict__:
+        return
+    source = loaded_source(instance)
+    if source != instance._image_source:
+        source_name = reset_variants(instance)
+        if source_name:
+            render_image_variants.enqueue(sender._meta.label_lower, instance.pk, source_name)
+        instance._image_source = source
+
+
+class ImageVariantField(serializers.Field):
+    """Read-only URL of a resized image variant, or of the original until it is rendered"""
+
+    def __init__(self, variant, original, **kwargs):
+        self.variant = variant
+        self.original = original
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.variant) or getattr(instance, self.original)
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
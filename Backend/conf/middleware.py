@@ -0,0 +1,129 @@
+"""
+Opt-in per-request profiling.
+
+``RequestProfilingMiddleware`` instruments a sample of requests: every SQL
+query is timed through a connection execute wrapper, and the request is
+split into view time (including serialization) and render time. The
+numbers are returned in a ``Server-Timing`` header, so they show up in the
+browser's network panel. Slow requests are logged, and so are repeated
+identical queries, which usually mean an N+1 pattern in a serializer.
+
+Unsampled requests only cost a call to ``random()``, so the middleware can
+stay on in production at a low ``SAMPLE_RATE``. It removes itself from the
+stack when ``REQUEST_PROFILING['ENABLED']`` is false.
+"""
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    # Requests slower than this are logged
+    'SLOW_REQUEST_MS': 500,
+    # A statement repeated this many times in one request is logged as a likely N+1
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+}
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_PROFILING', {})}
+
+
+class QueryRecorder:
+    """Execute wrapper that counts and times the queries of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Parameters are passed separately, so the same statement with
+            # different values counts as a repeat.
+            self.statements[sql] += 1
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        options = profiling_settings()
+        if not options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = options['SAMPLE_RATE']
+        self.slow_request_ms = options['SLOW_REQUEST_MS']
+        self.duplicate_threshold = options['DUPLICATE_QUERY_THRESHOLD']
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._profiling_view_started = request._profiling_view_finished = None
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        self.report(request, response, recorder, start, finished)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_profiling_view_started'):
+            request._profiling_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so it marks the end of the view
+        if hasattr(request, '_profiling_view_finished'):
+            request._profiling_view_finished = time.perf_counter()
+        return response
+
+    def report(self, request, response, recorder, start, finished):
+        total_ms = (finished - start) * 1000
+        metrics = [('db', recorder.duration * 1000, f'{recorder.count} queries')]
+        view_started = request._profiling_view_started
+        if view_started is not None:
+            view_finished = request._profiling_view_finished or finished
+            metrics.append(('view', (view_finished - view_started) * 1000, 'view and serialization'))
+            if request._profiling_view_finished is not None:
+                metrics.append(('render', (finished - view_finished) * 1000, 'rendering and inner middleware'))
+        metrics.append(('total', total_ms, 'request'))
+
+        duplicates = [
+            (sql, count) for sql, count in recorder.statements.most_common()
+            if count >= self.duplicate_threshold
+        ]
+        if duplicates:
+            metrics.append(('dup', 0, f'{len(duplicates)} repeated queries'))
+            for sql, count in duplicates:
+                logger.warning(
+                    "Possible N+1 on %s %s: query ran %d times: %s",
+                    request.method, request.path, count, sql
+                )
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f};desc="{description}"' for name, duration, description in metrics
+        )
+
+        if total_ms >= self.slow_request_ms:
+            logger.warning(
+                "Slow request %s %s: %d in %.0fms, %d queries in %.0fms",
+                request.method, request.path, response.status_code,
+                total_ms, recorder.count, recorder.duration * 1000
+            )
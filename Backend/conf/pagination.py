@@ -0,0 +1,95 @@
+"""
+Keyset cursor pagination shared by the API apps.
+
+DRF's ``CursorPagination`` filters on the first ordering field only and
+steps over rows that tie on it with an offset, so every page rescans the
+ties. ``KeysetCursorPagination`` puts the whole ordering into the cursor,
+for example ``(created_at, id)``. As long as the last field is unique,
+each page is one range condition on the matching index and ties never need
+an offset.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+def keyset_filter(ordering, values):
+    """Rows strictly after ``values`` in ``ordering``
+
+    ``(a, b) < (x, y)`` is written as ``a <= x AND (a < x OR b < y)`` so the
+    leading column bounds the index range.
+    """
+    field, *rest = ordering
+    value, *rest_values = values
+    name = field.lstrip('-')
+    lookup = 'lt' if field.startswith('-') else 'gt'
+    after = Q(**{f'{name}__{lookup}': value})
+    if not rest:
+        return after
+    return Q(**{f'{name}__{lookup}e': value}) & (after | keyset_filter(rest, rest_values))
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination keyed on every ordering field"""
+    position_separator = '|'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+        values = None if position is None else self.parse_position(queryset.model, position)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        results = self.fetch(queryset, ordering, values, self.page_size + 1)
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > self.page_size:
+            following = self._get_position_from_instance(results[-1], self.ordering)
+
+        # Cursors always hold a unique position, so links never need an offset
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def fetch(self, queryset, ordering, values, limit):
+        """Up to ``limit`` rows of ``queryset`` in ``ordering``, after ``values`` if given"""
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        return list(queryset[:limit])
+
+    def parse_position(self, model, position):
+        parts = position.split(self.position_separator)
+        if len(parts) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(part)
+                for field, part in zip(self.ordering, parts)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            values = [instance[name] for name in names]
+        else:
+            values = [getattr(instance, name) for name in names]
+        return self.position_separator.join(str(value) for value in values)
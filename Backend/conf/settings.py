@@ -33,6 +33,8 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'testserver']
 # Application definition
 
 INSTALLED_APPS = [
+    # ASGI runserver with WebSocket support; must come before staticfiles
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -48,10 +50,13 @@ INSTALLED_APPS = [
     # Local apps
     'accounts',
     'stories',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "conf.middleware.RequestProfilingMiddleware",
+    "django.middleware.gzip.GZipMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,6 +85,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "conf.wsgi.application"
+ASGI_APPLICATION = "conf.asgi.application"
 
 
 # Database
@@ -136,6 +142,88 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Cache
+# Anonymous story responses are cached here (see stories/cache.py). Use a
+# shared backend such as Redis or Memcached when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'storytelling',
+    },
+    # Namespace versions for the response cache (see stories/cache.py), kept
+    # apart so culling cached responses never evicts a version
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'storytelling-versions',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+STORIES_CACHE_TIMEOUT = 60
+
+# Most chapters a single bulk chapter request may create or update
+STORIES_CHAPTER_BULK_LIMIT = 500
+
+# Vote ingestion buffer (see stories/vote_buffer.py). When enabled, votes are
+# queued in-process and written in batches every FLUSH_INTERVAL seconds.
+STORIES_VOTE_BUFFER = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_PENDING': 500,
+    # Failed flushes retried before a batch's votes are logged and dropped
+    'MAX_RETRIES': 3,
+}
+
+# Following feeds (see stories/feed.py). Stories by authors with more
+# followers than FANOUT_LIMIT are merged in at read time instead of being
+# written to every follower's feed; new follows backfill this many stories.
+STORIES_FEED_FANOUT_LIMIT = 5000
+STORIES_FEED_BACKFILL = 50
+
+# Trending scores (see stories/trending.py), recomputed by the
+# compute_trending management command
+STORIES_TRENDING = {
+    'HALF_LIFE_HOURS': 24,
+    'INITIAL_WINDOW_DAYS': 7,
+}
+
+# Cover and avatar variants (see conf/images.py)
+STORIES_IMAGES = {
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+}
+
+# Background jobs (see jobs/queue.py), run by `manage.py run_jobs`. EAGER
+# runs each task in-process when the queuing transaction commits instead.
+JOBS = {
+    'EAGER': False,
+    'POLL_INTERVAL': 1.0,
+    'RETRY_DELAY': 10,
+}
+
+# Per-request SQL and timing profiling (see conf/middleware.py). Sampled
+# requests get a Server-Timing header; slow requests and repeated queries
+# are logged.
+REQUEST_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'SLOW_REQUEST_MS': 500,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+}
+
+# Channel layer for WebSocket tally updates. The in-memory layer only reaches
+# consumers in the same process; use channels_redis when running several.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+
+# Coalesce vote tally broadcasts to at most one per decision point per interval
+# in each process, whether or not it serves WebSocket consumers
+STORIES_TALLY_BROADCAST_INTERVAL = 0.25
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
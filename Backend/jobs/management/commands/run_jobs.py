@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import jobs_settings, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs, polling for new ones until interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Exit once no jobs are due instead of polling",
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        poll_interval = jobs_settings()['POLL_INTERVAL']
+        processed = 0
+        try:
+            while True:
+                claimed = run_pending(options['batch_size'])
+                processed += claimed
+                if claimed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
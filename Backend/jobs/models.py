@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A queued call to a registered task; deleted once it succeeds"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due jobs in run_at order
+            models.Index(
+                fields=['run_at', 'id'],
+                name='job_queued_run_at_idx',
+                condition=models.Q(status='queued')
+            ),
+            # Unique tasks look for an identical queued call before adding one
+            models.Index(
+                fields=['name'],
+                name='job_queued_name_idx',
+                condition=models.Q(status='queued')
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
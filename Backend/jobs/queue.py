@@ -0,0 +1,150 @@
+"""
+A small database-backed task queue.
+
+Functions decorated with ``@task`` can be called directly or queued with
+``.enqueue(*args, **kwargs)``. A queued call is stored as a ``Job`` row in
+the caller's transaction, so it only becomes visible to workers if the
+request that queued it commits. ``manage.py run_jobs`` claims due jobs,
+runs each in its own transaction and deletes it on success; failures are
+retried with exponential backoff up to the task's ``max_attempts`` and then
+kept with ``status='failed'`` for inspection.
+
+A job still ``running`` after ``LOCK_TIMEOUT`` is assumed to have lost its
+worker and is requeued, or marked failed if it has no attempts left, so a
+job that keeps killing its worker stops being claimed.
+
+With ``JOBS['EAGER']`` set, ``enqueue`` runs the task in-process when the
+caller's transaction commits instead; it is off by default, and the test
+suite drains the queue with ``run_jobs`` like a worker would.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EAGER': False,
+    'POLL_INTERVAL': 1.0,
+    'BATCH_SIZE': 100,
+    # Seconds before the first retry; doubles with each further attempt
+    'RETRY_DELAY': 10,
+    # Running jobs locked for longer than this are assumed lost and requeued
+    'LOCK_TIMEOUT': 300,
+}
+
+
+def jobs_settings():
+    return {**DEFAULTS, **getattr(settings, 'JOBS', {})}
+
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name, max_attempts, unique):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.unique = unique
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        """Queue a call; arguments must be JSON serializable"""
+        if jobs_settings()['EAGER']:
+            # Like a worker, only act once the caller's transaction commits,
+            # and log failures rather than raising them into the caller
+            transaction.on_commit(lambda: self.func(*args, **kwargs), robust=True)
+            return None
+
+        payload = {'args': list(args), 'kwargs': kwargs}
+        if self.unique:
+            # A call with the same arguments that hasn't started yet covers this one
+            queued = Job.objects.filter(name=self.name, status=Job.QUEUED, payload=payload).first()
+            if queued is not None:
+                return queued
+        return Job.objects.create(name=self.name, payload=payload, max_attempts=self.max_attempts)
+
+
+def task(name, max_attempts=3, unique=False):
+    """Register a function as a task under ``name``
+
+    Calls to a ``unique`` task are dropped while an identical call is still
+    queued, which suits idempotent work such as reindexing a row.
+    """
+    def decorator(func):
+        if name in registry:
+            raise ValueError(f"Task {name!r} is already registered")
+        registry[name] = Task(func, name, max_attempts, unique)
+        return registry[name]
+    return decorator
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` due jobs as running and return them"""
+    now = timezone.now()
+    lost = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=jobs_settings()['LOCK_TIMEOUT'])
+    )
+    lost.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_at=None, last_error="Worker lost while running the final attempt"
+    )
+    lost.update(status=Job.QUEUED)
+
+    due = Job.objects.filter(
+        status=Job.QUEUED,
+        run_at__lte=now
+    ).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+
+    # The conditional update is the lock: of several workers racing for a
+    # job, only one sees its row change.
+    claimed = [
+        pk for pk in due
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """Run one claimed job; returns True if it succeeded"""
+    try:
+        task = registry.get(job.name)
+        if task is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        with transaction.atomic():
+            task.func(*job.payload.get('args', []), **job.payload.get('kwargs', {}))
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %d", job.pk, job.name, job.attempts)
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.QUEUED
+            delay = jobs_settings()['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+        job.locked_at = None
+        job.last_error = traceback.format_exc()
+        job.save(update_fields=['status', 'run_at', 'locked_at', 'last_error'])
+        return False
+
+    job.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Claim and run one batch of due jobs; returns the number claimed"""
+    jobs = claim_jobs(limit or jobs_settings()['BATCH_SIZE'])
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import registry, task
+
+calls = []
+
+
+@task('jobs.tests.record', max_attempts=2)
+def record(value):
+    if value == 'fail':
+        raise ValueError("failed on purpose")
+    calls.append(value)
+
+
+@task('jobs.tests.record_once', unique=True)
+def record_once(value):
+    calls.append(value)
+
+
+@override_settings(JOBS={'EAGER': False, 'RETRY_DELAY': 0})
+class JobQueueTests(TestCase):
+    """Queued jobs run in the worker, with retries for failures"""
+
+    def setUp(self):
+        calls.clear()
+
+    def run_jobs(self):
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+    def test_enqueued_jobs_run_in_the_worker_and_are_deleted(self):
+        record.enqueue('first')
+        record.enqueue('second')
+        self.assertEqual(calls, [])
+
+        self.run_jobs()
+
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_are_retried_then_kept(self):
+        job = record.enqueue('fail')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('failed on purpose', job.last_error)
+
+    def test_unique_tasks_skip_calls_that_are_already_queued(self):
+        first = record_once.enqueue('a')
+        self.assertEqual(record_once.enqueue('a'), first)
+        record_once.enqueue('b')
+
+        self.run_jobs()
+        record_once.enqueue('a')
+        self.run_jobs()
+
+        self.assertEqual(calls, ['a', 'b', 'a'])
+
+    def test_lost_jobs_are_requeued_until_out_of_attempts(self):
+        stale = timezone.now() - timedelta(hours=1)
+        retry = Job.objects.create(name='jobs.tests.record', payload={'args': ['retried']},
+                                   status=Job.RUNNING, attempts=1, max_attempts=2, locked_at=stale)
+        spent = Job.objects.create(name='jobs.tests.record', payload={'args': ['lost']},
+                                   status=Job.RUNNING, attempts=2, max_attempts=2, locked_at=stale)
+
+        self.run_jobs()
+
+        self.assertEqual(calls, ['retried'])
+        self.assertFalse(Job.objects.filter(pk=retry.pk).exists())
+        spent.refresh_from_db()
+        self.assertEqual((spent.status, spent.attempts), (Job.FAILED, 2))
+
+    def test_unknown_tasks_fail(self):
+        Job.objects.create(name='jobs.tests.missing', max_attempts=1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.run_jobs()
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    @override_settings(JOBS={'EAGER': True})
+    def test_eager_mode_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(record.enqueue('now'))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('jobs.tests.record', registry)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StoriesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stories"
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401 - registers the tasks
+
+        post_migrate.connect(signals.create_search_index, sender=self)
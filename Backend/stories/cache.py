@@ -0,0 +1,159 @@
+"""
+Response caching for the public story endpoints.
+
+Anonymous GET responses are cached by path and query string under a
+namespace version. Writes never delete cache entries; they bump the
+namespace version instead, so every key built from the old version is
+ignored from then on and simply expires. ``stories/signals.py`` bumps the
+versions when stories, chapters, decision points or choices change, and the
+like/share/vote views bump them explicitly because their counter updates
+bypass model signals. Counter changes only bump the story's own namespace;
+feed cards may show counters up to ``STORIES_CACHE_TIMEOUT`` old rather
+than every like flushing every cached feed page.
+
+Versions live in the ``versions`` cache. They start at the current time in
+nanoseconds, so a version that is evicted and recreated is still newer
+than any version the cached responses were stored under.
+
+``ConditionalGetMixin`` adds ETag / Last-Modified validators to the same
+endpoints so polling clients get a 304 without the view doing any work.
+The validators are read from the story row rather than the cache, so they
+hold across processes.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .models import Story
+
+LIST_NAMESPACE = 'list'
+
+
+def story_namespace(slug):
+    return f'story:{slug}'
+
+
+def _version_key(namespace):
+    return f'stories:version:{namespace}'
+
+
+def get_version(namespace):
+    return caches['versions'].get_or_set(_version_key(namespace), time.time_ns, None)
+
+
+def bump_version(namespace):
+    versions = caches['versions']
+    try:
+        versions.incr(_version_key(namespace))
+    except ValueError:
+        versions.set(_version_key(namespace), time.time_ns(), None)
+
+
+def invalidate_story(slug, lists=True):
+    """Drop cached responses for one story, and for the feeds unless told not to
+
+    Versions are bumped immediately and again once the surrounding
+    transaction commits, so a response cached by a concurrent reader from
+    pre-commit data does not outlive the write.
+    """
+    namespaces = [story_namespace(slug)]
+    if lists:
+        namespaces.append(LIST_NAMESPACE)
+
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def story_validators(slug, user):
+    """Compute an ETag and Last-Modified timestamp for a published story
+
+    Both come from the story row's ``revision`` and ``revised_at``, which
+    every write to the story, its chapters, decision points and counters
+    bumps, so every worker agrees on them. Votes bump them once per tally
+    broadcast rather than per vote (see stories/realtime.py). Returns
+    ``(None, None)`` if no published story has this slug, leaving the view
+    to answer as it would for any other request.
+    """
+    state = Story.objects.filter(slug=slug, is_published=True).values_list('revision', 'revised_at').first()
+    if state is None:
+        return None, None
+
+    revision, revised_at = state
+    fingerprint = '|'.join(str(value) for value in [
+        revision,
+        revised_at.isoformat(),
+        # Responses include viewer state, so validators are per user
+        user.pk if user.is_authenticated else '',
+    ])
+    etag = 'W/"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+    return etag, int(revised_at.timestamp())
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs on a story's endpoints with 304 before any serialization"""
+    story_slug_url_kwarg = 'slug'
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = story_validators(self.kwargs[self.story_slug_url_kwarg], request.user)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CachedResponseMixin:
+    """Serve anonymous GETs from the cache under a versioned namespace"""
+    cache_namespace = LIST_NAMESPACE
+
+    def get_cache_namespace(self):
+        return self.cache_namespace
+
+    def get_cache_key(self, request):
+        namespace = self.get_cache_namespace()
+        fingerprint = hashlib.md5(
+            '|'.join([
+                request.get_host(),
+                request.path,
+                '&'.join(sorted(request.query_params.urlencode().split('&'))),
+            ]).encode()
+        ).hexdigest()
+        return f'stories:response:{namespace}:{get_version(namespace)}:{fingerprint}'
+
+    def get(self, request, *args, **kwargs):
+        # Responses for signed-in users carry viewer state (is_liked, can_edit)
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.STORIES_CACHE_TIMEOUT)
+        return response
+
+
+class CachedStoryResponseMixin(CachedResponseMixin):
+    """Cache per story, keyed on the slug in the URL"""
+    story_slug_url_kwarg = 'slug'
+
+    def get_cache_namespace(self):
+        return story_namespace(self.kwargs[self.story_slug_url_kwarg])
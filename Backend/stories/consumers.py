@@ -0,0 +1,37 @@
+import asyncio
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .models import DecisionPoint
+from .realtime import current_tallies, group_name, tally_broadcaster, tally_message
+
+
+class DecisionPointTallyConsumer(AsyncJsonWebsocketConsumer):
+    """Stream live vote tallies for one decision point"""
+
+    async def connect(self):
+        self.decision_point_id = self.scope['url_route']['kwargs']['decision_point_pk']
+        self.group_name = group_name(self.decision_point_id)
+
+        tallies = await self.get_tallies()
+        if tallies is None:
+            await self.close()
+            return
+
+        tally_broadcaster.attach(asyncio.get_running_loop())
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json(tally_message(self.decision_point_id, tallies))
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def tally_update(self, event):
+        await self.send_json({**event, 'type': 'tallies'})
+
+    @database_sync_to_async
+    def get_tallies(self):
+        if not DecisionPoint.objects.filter(pk=self.decision_point_id).exists():
+            return None
+        return current_tallies(self.decision_point_id)
@@ -0,0 +1,363 @@
+"""
+Synthetic dataset for load testing and for the endpoint benchmarks.
+
+Rows are written with ``bulk_create``, so model ``save()`` methods and
+signals don't run; counters, feed entries, the search index and trending
+scores are filled in explicitly afterwards. Story slugs come from
+``StoryQuerySet.bulk_create``.
+
+``Options`` holds the row counts at scale 1 and ``scale`` multiplies every
+count. Authors and stories are drawn with Zipf-like weights (``alpha``),
+so a few of them collect most of the follows, likes and shares. The
+``generate_synthetic_data`` command exposes the same options.
+
+Rows are generated and inserted ``batch_size`` at a time and each phase
+commits on its own, so memory stays flat however many rows are asked for:
+only the primary keys later phases sample from are kept, packed in arrays.
+Duplicate follows, votes, likes and shares drawn at random are dropped by
+their unique constraints on insert.
+"""
+import itertools
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import UserFollow
+
+from . import search
+from .models import Chapter, Choice, DecisionPoint, FeedEntry, Story, StoryShare, Vote
+from .trending import compute_trending
+
+User = get_user_model()
+
+PASSWORD = 'benchmark-pass'
+WORDS = (
+    'the a dark river city ship dragon door forest tower storm light shadow '
+    'voice road silver old quiet fire stone north night sea ruin crown map'
+).split()
+CATEGORIES = ['fantasy', 'mystery', 'scifi', 'romance', 'horror', 'adventure']
+PLATFORMS = ['twitter', 'facebook', 'email', 'link']
+
+
+@dataclass(frozen=True)
+class Options:
+    """Row counts at scale 1 and the shape of the generated data"""
+    users: int = 1000
+    follows: int = 5000
+    stories: int = 500
+    max_chapters: int = 7
+    votes: int = 20000
+    likes: int = 10000
+    shares: int = 3000
+    # Fraction of users who write stories
+    author_ratio: float = 0.2
+    # Power-law exponent for author and story popularity; 0 is uniform
+    alpha: float = 1.1
+    # Spread story creation times over this many days; 0 keeps them all at now
+    days: int = 0
+    # Prefix for generated usernames
+    prefix: str = 'user'
+    # Materialize following feeds, usually the largest table
+    feeds: bool = True
+    batch_size: int = 1000
+
+    def scaled(self, scale):
+        return replace(self, **{
+            name: getattr(self, name) * scale
+            for name in ('users', 'follows', 'stories', 'votes', 'likes', 'shares')
+        })
+
+
+@dataclass
+class Dataset:
+    """The rows the benchmarks aim their requests at"""
+    author: User
+    reader: User
+    # A user the reader doesn't follow
+    stranger: User
+    story: Story
+    chapter: Chapter
+    decision_point: DecisionPoint
+    choice: Choice
+
+
+@contextmanager
+def step(label, progress):
+    """Run one phase in its own transaction and report how long it took"""
+    start = time.monotonic()
+    with transaction.atomic():
+        yield
+    if progress is not None:
+        progress(label, time.monotonic() - start)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def popularity(rng, population, alpha):
+    """Return a sampler drawing from ``population`` with Zipf-like weights"""
+    population = array('q', population)
+    rng.shuffle(population)
+    cum_weights = array('d', itertools.accumulate(1 / (rank + 1) ** alpha for rank in range(len(population))))
+
+    def sample(k):
+        return rng.choices(population, cum_weights=cum_weights, k=k)
+    return sample
+
+
+def count_of(queryset, field):
+    """Subquery counting ``queryset`` rows whose ``field`` is the outer row"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount(model, ids, batch_size, **counters):
+    """Set ``counters`` on the rows in ``ids``, one primary key range at a time"""
+    if not ids:
+        return
+    for start in range(min(ids), max(ids) + 1, batch_size):
+        model.objects.filter(pk__gte=start, pk__lt=start + batch_size).update(**counters)
+
+
+def build(scale=1, seed=0, options=Options(), progress=None):
+    """Generate a dataset and return the rows the benchmarks use
+
+    ``progress`` is called with each step's label and duration in seconds.
+    """
+    options = options.scaled(scale)
+    rng = random.Random(seed)
+    batch_size = options.batch_size
+
+    def words(n):
+        return ' '.join(rng.choices(WORDS, k=n))
+
+    with step('users', progress):
+        password = make_password(PASSWORD)
+        user_ids = array('q')
+        author_ids = array('q')
+        # The first user is the benchmark author; the next two are the
+        # reader and the stranger, who never write
+        for batch in chunked(range(options.users), batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{options.prefix}{i}',
+                    email=f'{options.prefix}{i}@example.com',
+                    password=password,
+                    is_author=i == 0 or (i > 2 and rng.random() < options.author_ratio),
+                )
+                for i in batch
+            ])
+            user_ids.extend(user.pk for user in users)
+            author_ids.extend(user.pk for user in users if user.is_author)
+        author_id, reader_id, stranger_id = user_ids[:3]
+        popular_authors = popularity(rng, author_ids, options.alpha)
+
+    with step('follows', progress):
+        def edges():
+            # The benchmark author is followed by everyone; the reader follows every author
+            yield from ((user_id, author_id) for user_id in user_ids[1:])
+            yield from ((reader_id, other_id) for other_id in author_ids)
+            for batch in chunked(range(options.follows), batch_size):
+                pairs = zip(rng.choices(user_ids, k=len(batch)), popular_authors(len(batch)))
+                yield from ((follower, following) for follower, following in pairs if follower != following)
+
+        for batch in chunked(edges(), batch_size):
+            UserFollow.objects.bulk_create(
+                [UserFollow(follower_id=a, following_id=b) for a, b in batch], ignore_conflicts=True
+            )
+
+    with step('stories', progress):
+        # The benchmark author's first stories fill more than one page of their list
+        own = min(40, options.stories // 10)
+        now = timezone.now()
+        story_ids = array('q')
+        for batch in chunked(range(options.stories), batch_size):
+            mine = sum(1 for i in batch if i < own)
+            story_authors = [author_id] * mine + popular_authors(len(batch) - mine)
+            stories = Story.objects.bulk_create([
+                Story(
+                    title=words(4).title(),
+                    description=words(40),
+                    content=words(200),
+                    category=rng.choice(CATEGORIES),
+                    author_id=story_author,
+                )
+                for story_author in story_authors
+            ])
+            if options.days:
+                # auto_now_add overrides created_at on insert, so spread the
+                # stories over the last ``days`` days afterwards, oldest first
+                for i, story in zip(batch, stories):
+                    age = options.days * (options.stories - i - rng.random()) / options.stories
+                    story.created_at = now - timedelta(days=age)
+                Story.objects.bulk_update(stories, ['created_at'])
+            story_ids.extend(story.pk for story in stories)
+        popular_stories = popularity(rng, story_ids, options.alpha)
+
+    with step('chapters', progress):
+        # Chapters are assembled from a pool of paragraphs; drawing every
+        # word separately would dominate the run time
+        paragraphs = [words(100) for _ in range(64)]
+        chapter_ids = array('q')
+        chapter_orders = array('l')
+        for batch in chunked(story_ids, batch_size):
+            chapters = Chapter.objects.bulk_create([
+                Chapter(
+                    story_id=story_id,
+                    title=f'Chapter {order}',
+                    content='\n\n'.join(rng.choices(paragraphs, k=rng.randint(3, 20))),
+                    order=order,
+                )
+                for story_id in batch
+                for order in range(1, rng.randint(1, options.max_chapters) + 1)
+            ], batch_size=batch_size)
+            chapter_ids.extend(chapter.pk for chapter in chapters)
+            chapter_orders.extend(chapter.order for chapter in chapters)
+
+    with step('decision points', progress):
+        # Every chapter gets an open decision, and some keep a closed one
+        decision_point_ids = array('q')
+        for batch in chunked(zip(chapter_ids, chapter_orders), batch_size):
+            decision_points = DecisionPoint.objects.bulk_create([
+                DecisionPoint(
+                    chapter_id=chapter_id, question=f'What happens after Chapter {order}?', is_active=n == 0
+                )
+                for chapter_id, order in batch
+                for n in range(rng.randint(1, 2))
+            ], batch_size=batch_size)
+            decision_point_ids.extend(decision_point.pk for decision_point in decision_points)
+
+    with step('choices', progress):
+        # The choices of decision point i are choice_ids[offsets[i]:offsets[i + 1]]
+        choice_ids = array('q')
+        offsets = array('q', [0])
+        for batch in chunked(decision_point_ids, batch_size):
+            counts = [rng.randint(2, 4) for _ in batch]
+            choices = Choice.objects.bulk_create([
+                Choice(decision_point_id=decision_point_id, text=f'Option {n + 1}')
+                for decision_point_id, count in zip(batch, counts)
+                for n in range(count)
+            ], batch_size=batch_size)
+            choice_ids.extend(choice.pk for choice in choices)
+            for count in counts:
+                offsets.append(offsets[-1] + count)
+
+    with step('votes', progress):
+        # Leave the reader's ballot empty so the vote benchmark can cast one
+        voter_ids = user_ids[2:]
+        for batch in chunked(range(options.votes), batch_size):
+            votes = []
+            for _ in batch:
+                i = rng.randrange(len(decision_point_ids))
+                votes.append(Vote(
+                    user_id=rng.choice(voter_ids),
+                    decision_point_id=decision_point_ids[i],
+                    choice_id=choice_ids[rng.randrange(offsets[i], offsets[i + 1])],
+                ))
+            Vote.objects.bulk_create(votes, ignore_conflicts=True)
+        recount(Choice, choice_ids, batch_size, votes=count_of(Vote.objects.all(), 'choice'))
+
+    with step('likes and shares', progress):
+        for batch in chunked(range(options.likes), batch_size):
+            Story.likes.through.objects.bulk_create([
+                Story.likes.through(story_id=s, user_id=u)
+                for s, u in zip(popular_stories(len(batch)), rng.choices(user_ids, k=len(batch)))
+            ], ignore_conflicts=True)
+        for batch in chunked(range(options.shares), batch_size):
+            StoryShare.objects.bulk_create([
+                StoryShare(story_id=s, shared_by_id=u, platform=rng.choice(PLATFORMS))
+                for s, u in zip(popular_stories(len(batch)), rng.choices(user_ids, k=len(batch)))
+            ], ignore_conflicts=True)
+
+    with step('counters', progress):
+        recount(
+            Story, story_ids, batch_size,
+            likes_count=count_of(Story.likes.through.objects.all(), 'story'),
+            shares_count=count_of(StoryShare.objects.all(), 'story'),
+        )
+        recount(
+            User, user_ids, batch_size,
+            followers_count=count_of(UserFollow.objects.all(), 'following'),
+            following_count=count_of(UserFollow.objects.all(), 'follower'),
+            stories_count=count_of(Story.objects.all(), 'author'),
+        )
+
+    if options.feeds:
+        with step('feeds', progress):
+            materialize_feeds(author_ids, batch_size)
+
+    with step('search index', progress):
+        backend = search.get_backend()
+        for batch in chunked(story_ids, batch_size):
+            backend.index(batch)
+
+    with step('trending scores', progress):
+        compute_trending(batch_size=batch_size)
+
+    users = User.objects.in_bulk([author_id, reader_id, stranger_id])
+    story = Story.objects.get(pk=story_ids[0])
+    chapter = story.chapters.order_by('order').first()
+    decision_point = chapter.decision_points.filter(is_active=True).get()
+    return Dataset(
+        author=users[author_id],
+        reader=users[reader_id],
+        stranger=users[stranger_id],
+        story=story,
+        chapter=chapter,
+        decision_point=decision_point,
+        choice=decision_point.choices.order_by('pk').first(),
+    )
+
+
+def materialize_feeds(author_ids, batch_size):
+    """Fill following feeds as a follow's backfill would (see stories/feed.py)
+
+    Each follower gets the author's ``STORIES_FEED_BACKFILL`` most recent
+    stories, and authors above ``STORIES_FEED_FANOUT_LIMIT`` followers are
+    left to be merged in at read time. Authors are handled ``batch_size``
+    at a time, reading their stories and followers back from the database.
+    """
+    for authors in chunked(author_ids, batch_size):
+        fanned_out = User.objects.filter(
+            pk__in=authors,
+            followers_count__lte=settings.STORIES_FEED_FANOUT_LIMIT
+        ).values_list('pk', flat=True)
+        recent = {}
+        for story_id, story_author_id, created_at in Story.objects.filter(
+            author_id__in=fanned_out, is_published=True
+        ).order_by('author_id', '-created_at', '-id').values_list(
+            'pk', 'author_id', 'created_at'
+        ).iterator(chunk_size=batch_size):
+            by_author = recent.setdefault(story_author_id, [])
+            if len(by_author) < settings.STORIES_FEED_BACKFILL:
+                by_author.append((story_id, created_at))
+
+        follows = UserFollow.objects.filter(following_id__in=list(recent)).values_list(
+            'follower_id', 'following_id'
+        ).iterator(chunk_size=batch_size)
+        entries = (
+            FeedEntry(user_id=follower_id, story_id=story_id, created_at=created_at)
+            for follower_id, following_id in follows
+            for story_id, created_at in recent[following_id]
+        )
+        for batch in chunked(entries, batch_size):
+            FeedEntry.objects.bulk_create(batch)
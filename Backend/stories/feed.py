@@ -0,0 +1,117 @@
+"""
+Materialized "following" feeds.
+
+Publishing a story writes a ``FeedEntry`` for each of the author's
+followers (fan-out on write), so reading a feed never joins the follow
+graph against every story. Authors with more than
+``STORIES_FEED_FANOUT_LIMIT`` followers are skipped at publish time; their
+stories are merged in when the feed is read instead (fan-out on read).
+Reads walk the ``(user, created_at)`` FeedEntry index one page at a time,
+so a page costs the same however long the feed is.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from accounts.models import UserFollow
+from conf.pagination import KeysetCursorPagination, keyset_filter
+
+from .models import FeedEntry, Story
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def fans_out_on_write(author_id):
+    return User.objects.filter(
+        pk=author_id,
+        followers_count__lte=settings.STORIES_FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out_story(story):
+    """Add a published story to its author's followers' feeds"""
+    if not story.is_published or not fans_out_on_write(story.author_id):
+        return
+
+    follower_ids = UserFollow.objects.filter(
+        following_id=story.author_id
+    ).values_list('follower_id', flat=True).iterator(chunk_size=BATCH_SIZE)
+
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(FeedEntry(user_id=follower_id, story_id=story.pk, created_at=story.created_at))
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_follow(follower_id, author_id):
+    """Seed a new follower's feed with the author's recent stories"""
+    if not fans_out_on_write(author_id):
+        return
+
+    recent = Story.objects.filter(
+        author_id=author_id,
+        is_published=True
+    ).order_by('-created_at', '-id').values_list('pk', 'created_at')[:settings.STORIES_FEED_BACKFILL]
+
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=follower_id, story_id=pk, created_at=created_at) for pk, created_at in recent],
+        ignore_conflicts=True
+    )
+
+
+def remove_follow(follower_id, author_id):
+    FeedEntry.objects.filter(user_id=follower_id, story__author_id=author_id).delete()
+
+
+def fan_out_on_read_authors(user):
+    """Followed authors whose stories are not materialized into feeds"""
+    return UserFollow.objects.filter(
+        follower=user,
+        following__followers_count__gt=settings.STORIES_FEED_FANOUT_LIMIT
+    ).values_list('following_id', flat=True)
+
+
+def following_feed_keys(user, ordering, after, limit):
+    """(created_at, story_id) keys of up to ``limit`` stories in ``user``'s feed
+
+    ``ordering`` is (created_at, id) in either direction and ``after`` the
+    cursor position to continue from. Materialized entries are read in
+    order from the user's FeedEntry index; the few authors fanned out on
+    read are merged in from the story table. Each page is two bounded range
+    scans, however long the feed is.
+    """
+    entry_ordering = [field.replace('id', 'story_id') if field.lstrip('-') == 'id' else field for field in ordering]
+    entries = FeedEntry.objects.filter(user=user, story__is_published=True)
+    if after is not None:
+        entries = entries.filter(keyset_filter(entry_ordering, after))
+    keys = set(entries.order_by(*entry_ordering).values_list('created_at', 'story_id')[:limit])
+
+    authors = list(fan_out_on_read_authors(user))
+    if authors:
+        stories = Story.objects.filter(author_id__in=authors, is_published=True)
+        if after is not None:
+            stories = stories.filter(keyset_filter(ordering, after))
+        # Entries written before an author passed the limit can repeat here;
+        # the set drops them
+        keys.update(stories.order_by(*ordering).values_list('created_at', 'id')[:limit])
+
+    return sorted(keys, reverse=ordering[0].startswith('-'))[:limit]
+
+
+class FollowingFeedPagination(KeysetCursorPagination):
+    """Page the requesting user's following feed by (created_at, id), newest first
+
+    The view's queryset only shapes how stories are loaded; which stories
+    are on a page comes from ``following_feed_keys``.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def fetch(self, queryset, ordering, values, limit):
+        keys = following_feed_keys(self.request.user, ordering, values, limit)
+        stories = queryset.in_bulk([story_id for _, story_id in keys])
+        return [stories[story_id] for _, story_id in keys if story_id in stories]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from stories.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = "Decay trending scores and fold in story activity since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = compute_trending(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated trending scores for {updated} stories"))
@@ -0,0 +1,59 @@
+from dataclasses import replace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from stories.dataset import Options, build
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate a synthetic dataset (users, power-law follows, stories, chapters, "
+        "decision points, choices, votes, likes and shares) for load testing. "
+        "Counts are per unit of --scale and default to the benchmark dataset's. "
+        "Rows are inserted in batches and each phase commits separately."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help="Multiply every count")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--follows', type=int)
+        parser.add_argument('--stories', type=int)
+        parser.add_argument('--max-chapters', type=int)
+        parser.add_argument('--votes', type=int)
+        parser.add_argument('--likes', type=int)
+        parser.add_argument('--shares', type=int)
+        parser.add_argument('--author-ratio', type=float, help="Fraction of users who write stories")
+        parser.add_argument('--alpha', type=float,
+                            help="Power-law exponent for author and story popularity")
+        parser.add_argument('--days', type=int, default=90,
+                            help="Spread story creation times over this many days")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--prefix', default='synthetic', help="Prefix for generated usernames")
+        parser.add_argument('--skip-feeds', action='store_true',
+                            help="Don't materialize following feeds, usually the largest table")
+
+    def handle(self, *args, **options):
+        given = {
+            name: options[name]
+            for name in ('users', 'follows', 'stories', 'max_chapters', 'votes', 'likes', 'shares',
+                         'author_ratio', 'alpha', 'days', 'batch_size', 'prefix')
+            if options[name] is not None
+        }
+        dataset_options = replace(Options(), feeds=not options['skip_feeds'], **given)
+        if dataset_options.users < 3:
+            raise CommandError("At least 3 users are needed")
+        if User.objects.filter(username=f'{dataset_options.prefix}0').exists():
+            raise CommandError(
+                f"Users prefixed {dataset_options.prefix!r} already exist; pass a different --prefix"
+            )
+
+        build(
+            scale=options['scale'],
+            seed=options['seed'],
+            options=dataset_options,
+            progress=lambda label, seconds: self.stdout.write(f"{label}: {seconds:.1f}s"),
+        )
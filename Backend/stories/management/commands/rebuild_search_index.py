@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from stories import search
+from stories.models import Story
+
+
+class Command(BaseCommand):
+    help = "Create the story full-text index if needed and reindex every story"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend(require_index=False)
+        backend.ensure_index()
+
+        batch_size = options['batch_size']
+        story_ids = list(Story.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(story_ids), batch_size):
+            backend.index(story_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {len(story_ids)} stories"))
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts.models import UserFollow
+from stories.models import Story, StoryShare
+
+User = get_user_model()
+
+
+def _count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored story and user counters from the underlying rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report drifted rows without writing the corrected counts",
+        )
+
+    def handle(self, *args, **options):
+        self.reconcile(Story, 'stories', {
+            'likes_count': _count_subquery(Story.likes.through.objects.all(), 'story'),
+            'shares_count': _count_subquery(StoryShare.objects.all(), 'story'),
+        }, options['dry_run'])
+        self.reconcile(User, 'users', {
+            'followers_count': _count_subquery(UserFollow.objects.all(), 'following'),
+            'following_count': _count_subquery(UserFollow.objects.all(), 'follower'),
+            'stories_count': _count_subquery(Story.objects.all(), 'author'),
+        }, options['dry_run'])
+
+    def reconcile(self, model, label, counters, dry_run):
+        actual = {f'actual_{field}': expression for field, expression in counters.items()}
+        drift = Q()
+        for field in counters:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        drifted_ids = list(model.objects.annotate(**actual).filter(drift).values_list('pk', flat=True))
+
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS(f"All {label} counters are in sync"))
+            return
+
+        if dry_run:
+            self.stdout.write(f"{len(drifted_ids)} {label} have drifted counters")
+            return
+
+        drifted = model.objects.filter(pk__in=drifted_ids)
+        # Story counters appear in responses, so changing them is a revision
+        updated = drifted.touch(**counters) if model is Story else drifted.update(**counters)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters on {updated} {label}"))
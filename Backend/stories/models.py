@@ -1,11 +1,68 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 import uuid
 
 User = get_user_model()
 
+SLUG_MAX_LENGTH = 50
+SLUG_SUFFIX_LENGTH = 8
+SLUG_ATTEMPTS = 5
+# Path segments routed ahead of stories/<slug:slug>/ in stories/urls.py; a
+# story slugged as one of these would be unreachable, so they always get a
+# suffix
+RESERVED_SLUGS = frozenset({'feed', 'trending', 'search', 'user'})
+
+def slug_base(title):
+    """Slugify a title, leaving room for a collision suffix"""
+    return slugify(title)[:SLUG_MAX_LENGTH - SLUG_SUFFIX_LENGTH - 1].strip('-') or 'story'
+
+def suffixed_slug(base):
+    return f"{base}-{uuid.uuid4().hex[:SLUG_SUFFIX_LENGTH]}"
+
+class StoryQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Assign missing slugs with one lookup per batch, then insert
+
+        Stories whose title slug is already taken, in the table or earlier
+        in the batch, get a random suffix. A concurrent insert can still
+        claim a slug first, in which case the unique index raises as usual.
+        """
+        objs = list(objs)
+        pending = [obj for obj in objs if not obj.slug]
+        # Slugs assigned to earlier chunks aren't in the table yet
+        taken = set(RESERVED_SLUGS)
+        for start in range(0, len(pending), 500):
+            batch = pending[start:start + 500]
+            bases = [slug_base(obj.title) for obj in batch]
+            taken.update(self.model._base_manager.filter(
+                slug__in=set(bases)
+            ).values_list('slug', flat=True))
+            for obj, base in zip(batch, bases):
+                obj.slug = base if base not in taken else suffixed_slug(base)
+                taken.add(obj.slug)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def touch(self, **updates):
+        """Update the stories and mark their API responses as changed
+
+        Conditional GETs validate against ``revision`` and ``revised_at``
+        (see stories/cache.py), so writes that change what a story's
+        endpoints return without saving the story itself go through here.
+        """
+        return self.update(revision=F('revision') + 1, revised_at=timezone.now(), **updates)
+
+    def recount_likes(self):
+        """Set ``likes_count`` from the likes table, for likes the views didn't count"""
+        likes = Story.likes.through.objects.filter(
+            story=OuterRef('pk')
+        ).order_by().values('story').annotate(n=Count('pk')).values('n')
+        return self.touch(likes_count=Coalesce(Subquery(likes, output_field=models.IntegerField()), 0))
+
 class Story(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
@@ -13,6 +70,9 @@ class Story(models.Model):
     description = models.TextField()
     content = models.TextField()
     cover_image = models.ImageField(upload_to='story_covers/', null=True, blank=True)
+    # Resized copies of cover_image, rendered by conf/images.py
+    cover_thumbnail = models.ImageField(null=True, blank=True, editable=False)
+    cover_medium = models.ImageField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
@@ -28,29 +88,63 @@ class Story(models.Model):
         through='StoryShare',
         related_name='shared_stories'
     )
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    shares_count = models.PositiveIntegerField(default=0, editable=False)
+    # Change markers for everything the story's endpoints return, including
+    # chapters, decision points, votes and counters; see StoryQuerySet.touch
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    revised_at = models.DateTimeField(auto_now=True)
+
+    objects = StoryQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-            # If slug exists, append a UUID
-            if Story.objects.filter(slug=self.slug).exists():
-                self.slug = f"{self.slug}-{str(uuid.uuid4())[:8]}"
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        # Let the unique index arbitrate: try the plain slug and fall back to
+        # a suffixed one only if the insert collides, so the common case
+        # costs no lookup and concurrent creates can't both claim a slug.
+        base = slug_base(self.title)
+        self.slug = base if base not in RESERVED_SLUGS else suffixed_slug(base)
+        for attempt in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Only a slug collision is worth retrying
+                collided = Story._base_manager.filter(slug=self.slug).exists()
+                if not collided or attempt == SLUG_ATTEMPTS - 1:
+                    self.slug = ''
+                    raise
+                self.slug = suffixed_slug(base)
 
     def __str__(self):
         return self.title
 
-    @property
-    def likes_count(self):
-        return self.likes.count()
-
-    @property
-    def shares_count(self):
-        return self.shares.count()
-
     class Meta:
         verbose_name_plural = 'Stories'
         ordering = ['-created_at']
+        indexes = [
+            # Published feeds, newest first, matching the (created_at, id)
+            # keyset used by StoryCursorPagination
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='story_published_created_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='story_category_created_idx',
+                condition=models.Q(is_published=True),
+            ),
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='story_author_created_idx',
+                condition=models.Q(is_published=True),
+            ),
+            # compute_trending looks for like growth among recently revised stories
+            models.Index(fields=['revised_at'], name='story_revised_idx'),
+        ]
 
 class StoryShare(models.Model):
     story = models.ForeignKey(Story, on_delete=models.CASCADE)
@@ -60,6 +154,11 @@ class StoryShare(models.Model):
 
     class Meta:
         unique_together = ('story', 'shared_by', 'platform')
+        indexes = [
+            models.Index(fields=['story', '-shared_at', '-id'], name='storyshare_story_shared_idx'),
+            # compute_trending reads shares since its last run
+            models.Index(fields=['shared_at'], name='storyshare_shared_idx'),
+        ]
 
     def __str__(self):
         return f"{self.shared_by.username} shared {self.story.title} on {self.platform}"
@@ -78,6 +177,10 @@ class Chapter(models.Model):
     class Meta:
         ordering = ['order']
         unique_together = ('story', 'order')
+        indexes = [
+            # compute_trending reads chapters since its last run
+            models.Index(fields=['created_at'], name='chapter_created_idx'),
+        ]
 
 class DecisionPoint(models.Model):
     chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='decision_points')
@@ -89,6 +192,15 @@ class DecisionPoint(models.Model):
     def __str__(self):
         return f"Decision Point for {self.chapter}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['chapter', '-created_at'],
+                name='decisionpoint_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
 class Choice(models.Model):
     decision_point = models.ForeignKey(DecisionPoint, on_delete=models.CASCADE, related_name='choices')
     text = models.CharField(max_length=500)
@@ -100,10 +212,54 @@ class Choice(models.Model):
 class Vote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    decision_point = models.ForeignKey(DecisionPoint, on_delete=models.CASCADE, related_name='votes')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('user', 'choice')
+        unique_together = ('user', 'decision_point')
+        indexes = [
+            # compute_trending reads votes since its last run
+            models.Index(fields=['created_at'], name='vote_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} voted for {self.choice.text}"
+
+class FeedEntry(models.Model):
+    """A published story in one follower's precomputed home feed"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    story = models.ForeignKey(Story, on_delete=models.CASCADE, related_name='feed_entries')
+    # Copied from the story so a user's feed can be read from one index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'story')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-story'], name='feedentry_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.story.title} in {self.user.username}'s feed"
+
+class TrendingScore(models.Model):
+    """Time-decayed popularity of a story, maintained by `compute_trending`"""
+    story = models.OneToOneField(Story, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField(default=0)
+    # likes_count as of the last run; likes carry no timestamp, so new likes
+    # are detected as growth of the counter
+    likes_seen = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trendingscore_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.story.title}: {self.score:.2f}"
+
+class TrendingRun(models.Model):
+    """Bookmark of the activity already folded into trending scores"""
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Trending computed at {self.computed_at}"
@@ -0,0 +1,16 @@
+from conf.pagination import KeysetCursorPagination
+
+
+class StoryCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over (created_at, id), newest first
+
+    Avoids the COUNT(*) and OFFSET scans of page-number pagination, so deep
+    pages of an infinite-scroll feed cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class StoryShareCursorPagination(StoryCursorPagination):
+    ordering = ('-shared_at', '-id')
@@ -0,0 +1,155 @@
+"""
+Push vote tallies to readers watching a decision point.
+
+Readers connect to ``ws/decision-points/<id>/`` (see ``consumers.py``) and
+join that decision point's channel-layer group. After a vote is recorded
+``tally_broadcaster.schedule()`` is called; broadcasts are coalesced so each
+decision point sends at most one update per ``STORIES_TALLY_BROADCAST_INTERVAL``
+seconds per process however many votes arrive.
+
+Each broadcast also marks the story revised, which is what changes its
+conditional-GET validators (see ``cache.story_validators``) after votes.
+Doing it here rather than in the vote's transaction keeps concurrent votes
+on one story from queueing on its row, at the cost of validators trailing
+the tallies by up to one interval.
+"""
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Choice, Story
+from .vote_buffer import vote_buffer
+
+logger = logging.getLogger(__name__)
+
+
+def group_name(decision_point_id):
+    return f'decision_point_{decision_point_id}'
+
+
+def current_tallies(decision_point_id):
+    tallies = {
+        choice_id: votes
+        for choice_id, votes in Choice.objects.filter(
+            decision_point_id=decision_point_id
+        ).values_list('id', 'votes')
+    }
+    if vote_buffer.enabled:
+        tallies = vote_buffer.merge_tallies(tallies)
+    return tallies
+
+
+def mark_revised(decision_point_id):
+    Story.objects.filter(chapters__decision_points=decision_point_id).touch()
+
+
+def tally_message(decision_point_id, tallies):
+    return {
+        'type': 'tallies',
+        'decision_point': decision_point_id,
+        # JSON object keys are strings; keep them explicit for clients
+        'tallies': {str(choice_id): votes for choice_id, votes in tallies.items()},
+    }
+
+
+class TallyBroadcaster:
+    """Coalesce tally broadcasts on the event loop serving the consumers
+
+    Consumers attach their loop when they connect. Scheduled broadcasts
+    wait there for the interval and send from that loop, so the channel
+    layer is only ever used from the loop it belongs to. A process with no
+    consumer loop (a WSGI worker, for example) coalesces the same way on a
+    timer thread per decision point instead.
+    """
+
+    def __init__(self):
+        self._loop = None
+        # Decision point id -> pending flush task, only touched on the loop
+        self._scheduled = {}
+        # Decision point id -> pending timer, for processes without a loop
+        self._lock = threading.Lock()
+        self._timers = {}
+
+    def attach(self, loop):
+        if loop is not self._loop:
+            self._loop = loop
+            self._scheduled = {}
+
+    def schedule(self, decision_point_id):
+        """Queue a tally broadcast, merging with one already pending"""
+        interval = settings.STORIES_TALLY_BROADCAST_INTERVAL
+        loop = self._loop
+        if not interval:
+            self.broadcast(decision_point_id)
+        elif loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._schedule_on_loop, decision_point_id, interval)
+        else:
+            self._schedule_timer(decision_point_id, interval)
+
+    def _schedule_timer(self, decision_point_id, interval):
+        with self._lock:
+            if decision_point_id in self._timers:
+                return
+            timer = threading.Timer(interval, self._timed_broadcast, [decision_point_id])
+            timer.daemon = True
+            self._timers[decision_point_id] = timer
+        timer.start()
+
+    def _timed_broadcast(self, decision_point_id):
+        # Votes committed from here on schedule the next broadcast
+        with self._lock:
+            self._timers.pop(decision_point_id, None)
+        try:
+            self.broadcast(decision_point_id)
+        except Exception:
+            logger.exception("Failed to broadcast tallies for decision point %s", decision_point_id)
+        finally:
+            # Timer threads are outside the request cycle, so nothing else
+            # closes the connection they open
+            close_old_connections()
+
+    def _schedule_on_loop(self, decision_point_id, interval):
+        if decision_point_id not in self._scheduled:
+            self._scheduled[decision_point_id] = asyncio.ensure_future(
+                self._broadcast_later(decision_point_id, interval)
+            )
+
+    async def _broadcast_later(self, decision_point_id, interval):
+        await asyncio.sleep(interval)
+        # Votes committed from here on schedule the next broadcast
+        self._scheduled.pop(decision_point_id, None)
+        try:
+            await self.abroadcast(decision_point_id)
+        except Exception:
+            logger.exception("Failed to broadcast tallies for decision point %s", decision_point_id)
+
+    async def abroadcast(self, decision_point_id):
+        await database_sync_to_async(mark_revised)(decision_point_id)
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        tallies = await database_sync_to_async(current_tallies)(decision_point_id)
+        await channel_layer.group_send(
+            group_name(decision_point_id),
+            {**tally_message(decision_point_id, tallies), 'type': 'tally.update'}
+        )
+
+    def broadcast(self, decision_point_id):
+        mark_revised(decision_point_id)
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        message = tally_message(decision_point_id, current_tallies(decision_point_id))
+        async_to_sync(channel_layer.group_send)(
+            group_name(decision_point_id),
+            {**message, 'type': 'tally.update'}
+        )
+
+
+tally_broadcaster = TallyBroadcaster()
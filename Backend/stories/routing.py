@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/decision-points/<int:decision_point_pk>/', consumers.DecisionPointTallyConsumer.as_asgi()),
+]
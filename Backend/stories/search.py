@@ -0,0 +1,238 @@
+"""
+Full-text search over stories.
+
+Each story is indexed as one document built from its title, description,
+content and the text of its chapters. The index lives next to the story
+tables and is updated asynchronously: writes enqueue ``stories.index_stories``
+and ``stories.remove_stories`` jobs (see stories/tasks.py), so results lag the
+rows they mirror until the job worker catches up.
+
+* SQLite uses an FTS5 virtual table ranked with ``bm25()``.
+* PostgreSQL uses a ``tsvector`` table with a GIN index, ranked with
+  ``ts_rank()`` and highlighted with ``ts_headline()``.
+* Any other database falls back to ``icontains`` filtering without ranking.
+
+Snippets are HTML-escaped, with matched terms wrapped in ``<mark>`` tags.
+"""
+import html
+import logging
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Chapter, Story
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_START = '\x02'
+SNIPPET_STOP = '\x03'
+
+# Database aliases whose index table is known to exist
+_indexed_aliases = set()
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def render_snippet(snippet):
+    snippet = html.escape(snippet or '')
+    return snippet.replace(SNIPPET_START, '<mark>').replace(SNIPPET_STOP, '</mark>')
+
+
+def story_documents(story_ids):
+    """Yield (story_id, title, description, body) for the given stories"""
+    chapters = {}
+    for story_id, title, content in Chapter.objects.filter(
+        story_id__in=story_ids
+    ).order_by('story_id', 'order').values_list('story_id', 'title', 'content'):
+        chapters.setdefault(story_id, []).extend([title, content])
+
+    for story_id, title, description, content in Story.objects.filter(
+        pk__in=story_ids
+    ).values_list('pk', 'title', 'description', 'content'):
+        body = '\n'.join([content, *chapters.get(story_id, [])])
+        yield story_id, title, description, body
+
+
+class FallbackSearchBackend:
+    """Unindexed substring matching for databases without a text index"""
+
+    def ensure_index(self):
+        pass
+
+    def index(self, story_ids):
+        pass
+
+    def remove(self, story_ids):
+        pass
+
+    def filter(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query):
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+    def search(self, query, limit):
+        story_ids = self.filter(Story.objects.all(), query).values_list('pk', flat=True)[:limit]
+        return [(story_id, 0.0, '') for story_id in story_ids]
+
+
+class SQLiteSearchBackend:
+    table = 'stories_story_fts'
+
+    def match_expression(self, query):
+        # Quote every term so user input can't inject FTS5 syntax, and
+        # prefix-match it so partially typed words still hit.
+        terms = search_terms(query)
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def ensure_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                "USING fts5(title, description, body, tokenize='porter unicode61')"
+            )
+
+    def index(self, story_ids):
+        story_ids = list(story_ids)
+        self.remove(story_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description, body) VALUES (%s, %s, %s, %s)",
+                list(story_documents(story_ids))
+            )
+
+    def remove(self, story_ids):
+        story_ids = list(story_ids)
+        if not story_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(story_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", story_ids)
+
+    def filter(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match])
+        )
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({self.table}, 10.0, 4.0, 1.0), "
+                f"snippet({self.table}, -1, %s, %s, '…', 24) "
+                f"FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, 10.0, 4.0, 1.0) LIMIT %s",
+                [SNIPPET_START, SNIPPET_STOP, match, limit]
+            )
+            # bm25() is lower-is-better; flip it so higher ranks are better
+            return [(story_id, -rank, snippet) for story_id, rank, snippet in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    table = 'stories_story_search'
+    config = 'english'
+
+    def ensure_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "story_id bigint PRIMARY KEY, document tsvector NOT NULL, body text NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document_idx "
+                f"ON {self.table} USING gin (document)"
+            )
+
+    def index(self, story_ids):
+        rows = list(story_documents(story_ids))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (story_id, document, body) VALUES ("
+                "%s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C'), "
+                "%s) "
+                "ON CONFLICT (story_id) DO UPDATE SET document = EXCLUDED.document, body = EXCLUDED.body",
+                [
+                    (
+                        story_id, self.config, title, self.config, description,
+                        self.config, body, '\n'.join([title, description, body])
+                    )
+                    for story_id, title, description, body in rows
+                ]
+            )
+
+    def remove(self, story_ids):
+        story_ids = list(story_ids)
+        if not story_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE story_id = ANY(%s)", [story_ids])
+
+    def filter(self, queryset, query):
+        if not search_terms(query):
+            return queryset.none()
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT story_id FROM {self.table} "
+                "WHERE document @@ websearch_to_tsquery(%s::regconfig, %s)",
+                [self.config, query]
+            )
+        )
+
+    def search(self, query, limit):
+        if not search_terms(query):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT story_id, ts_rank(document, q), "
+                "ts_headline(%s::regconfig, body, q, %s) "
+                f"FROM {self.table}, websearch_to_tsquery(%s::regconfig, %s) q "
+                "WHERE document @@ q ORDER BY 2 DESC LIMIT %s",
+                [
+                    self.config,
+                    f'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=35, MinWords=15',
+                    self.config, query, limit
+                ]
+            )
+            return cursor.fetchall()
+
+
+def get_backend(require_index=True):
+    """The search backend for the current database
+
+    Until its index table exists (``migrate`` or ``rebuild_search_index``
+    creates it), the unindexed fallback stands in so that story writes and
+    searches keep working. Pass ``require_index=False`` to get the indexed
+    backend regardless, for example to create the table.
+    """
+    if connection.vendor == 'sqlite':
+        backend = SQLiteSearchBackend()
+    elif connection.vendor == 'postgresql':
+        backend = PostgresSearchBackend()
+    else:
+        return FallbackSearchBackend()
+    if require_index and not has_index(backend):
+        logger.warning("Search index %s is missing; using unindexed search", backend.table)
+        return FallbackSearchBackend()
+    return backend
+
+
+def has_index(backend):
+    # Only a positive answer is cached, so the index is picked up as soon
+    # as it is created
+    if connection.alias not in _indexed_aliases:
+        if backend.table not in connection.introspection.table_names():
+            return False
+        _indexed_aliases.add(connection.alias)
+    return True
@@ -1,14 +1,26 @@
 from rest_framework import serializers
+from conf.images import ImageVariantField
 from .models import Story, Chapter, DecisionPoint, Choice, Vote, StoryShare
+from .vote_buffer import vote_buffer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 280
+
 class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Choice
         fields = ['id', 'text', 'votes']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Include votes still waiting in the ingestion buffer
+        if 'votes' in data and vote_buffer.enabled:
+            data['votes'] += vote_buffer.pending_votes(instance.pk)
+        return data
+
 class DecisionPointSerializer(serializers.ModelSerializer):
     choices = ChoiceSerializer(many=True, read_only=True)
     
@@ -23,43 +35,144 @@ class ChapterSerializer(serializers.ModelSerializer):
         model = Chapter
         fields = ['id', 'title', 'content', 'order', 'decision_points', 'created_at']
 
-class StorySerializer(serializers.ModelSerializer):
+class ChapterSummarySerializer(serializers.ModelSerializer):
+    """Chapter metadata for listings; the body is fetched from the content endpoint"""
+    decision_points = DecisionPointSerializer(many=True, read_only=True)
+    content_length = serializers.IntegerField(read_only=True, default=0)
+
+    class Meta:
+        model = Chapter
+        fields = ['id', 'title', 'order', 'content_length', 'decision_points', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class ChapterContentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Chapter
+        fields = ['id', 'title', 'order', 'content', 'updated_at']
+        read_only_fields = fields
+
+class ChapterBulkItemSerializer(serializers.Serializer):
+    """One entry of a bulk chapter request: an update when ``id`` is given, else a new chapter"""
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=200, required=False)
+    content = serializers.CharField(required=False)
+    order = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'id' not in attrs:
+            missing = [name for name in ('title', 'content', 'order') if name not in attrs]
+            if missing:
+                raise serializers.ValidationError(
+                    {name: "This field is required for new chapters." for name in missing}
+                )
+        return attrs
+
+class ChapterBulkSerializer(serializers.Serializer):
+    chapters = ChapterBulkItemSerializer(
+        many=True, allow_empty=False, max_length=settings.STORIES_CHAPTER_BULK_LIMIT
+    )
+
+    def validate_chapters(self, chapters):
+        ids = [item['id'] for item in chapters if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each chapter may appear only once.")
+        return chapters
+
+class StorySummarySerializer(serializers.ModelSerializer):
+    """Card-sized story representation for feeds, without content or chapters"""
+    cover_image = ImageVariantField('cover_thumbnail', 'cover_image')
     author_username = serializers.CharField(source='author.username', read_only=True)
+    excerpt = serializers.SerializerMethodField()
+    chapters_count = serializers.IntegerField(read_only=True, default=0)
     likes_count = serializers.ReadOnlyField()
     shares_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
     is_shared = serializers.SerializerMethodField()
     can_edit = serializers.SerializerMethodField()
-    chapters = ChapterSerializer(many=True, read_only=True)
 
     class Meta:
         model = Story
         fields = (
-            'id', 'title', 'slug', 'description', 'content', 'cover_image',
-            'category', 'author', 'author_username', 'chapters', 'created_at', 
-            'updated_at', 'is_active', 'is_published', 'likes_count', 
-            'shares_count', 'is_liked', 'is_shared', 'can_edit'
+            'id', 'title', 'slug', 'excerpt', 'cover_image', 'category',
+            'author', 'author_username', 'created_at', 'chapters_count',
+            'likes_count', 'shares_count', 'is_liked', 'is_shared', 'can_edit'
         )
-        read_only_fields = ('author', 'slug')
+        read_only_fields = fields
+
+    def get_excerpt(self, obj):
+        # List querysets annotate a truncated excerpt so the full
+        # description column is never loaded.
+        excerpt = getattr(obj, 'excerpt', None)
+        if excerpt is None:
+            excerpt = obj.description[:EXCERPT_LENGTH]
+        return excerpt
 
     def get_is_liked(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            liked_story_ids = self.context.get('liked_story_ids')
+            if liked_story_ids is not None:
+                return obj.pk in liked_story_ids
             return obj.likes.filter(id=request.user.id).exists()
         return False
 
     def get_is_shared(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.shares.filter(id=request.user.id).exists()
+            shared_story_ids = self.context.get('shared_story_ids')
+            if shared_story_ids is not None:
+                return obj.pk in shared_story_ids
+            return StoryShare.objects.filter(story=obj, shared_by=request.user).exists()
         return False
 
     def get_can_edit(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.author == request.user
+            return obj.author_id == request.user.id
         return False
 
+class StorySearchResultSerializer(StorySummarySerializer):
+    """Story summary plus its search rank and highlighted match snippet"""
+    rank = serializers.SerializerMethodField()
+    snippet = serializers.SerializerMethodField()
+
+    class Meta(StorySummarySerializer.Meta):
+        fields = StorySummarySerializer.Meta.fields + ('rank', 'snippet')
+        read_only_fields = fields
+
+    def get_rank(self, obj):
+        return self.context['search_ranking'][obj.pk][0]
+
+    def get_snippet(self, obj):
+        return self.context['search_ranking'][obj.pk][1]
+
+class StorySerializer(StorySummarySerializer):
+    excerpt = None
+    chapters_count = None
+    cover_image = serializers.ImageField(required=False, allow_null=True)
+    cover_medium = ImageVariantField('cover_medium', 'cover_image')
+    chapters = ChapterSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Story
+        fields = (
+            'id', 'title', 'slug', 'description', 'content', 'cover_image', 'cover_medium',
+            'category', 'author', 'author_username', 'chapters', 'created_at', 
+            'updated_at', 'is_active', 'is_published', 'likes_count', 
+            'shares_count', 'is_liked', 'is_shared', 'can_edit'
+        )
+        read_only_fields = ('author', 'slug')
+
+class StoryTreeSerializer(serializers.ModelSerializer):
+    """A story with every chapter, decision point and choice, for the reader"""
+    author_username = serializers.CharField(source='author.username', read_only=True)
+    chapters = ChapterSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Story
+        fields = ('id', 'title', 'slug', 'author', 'author_username', 'updated_at', 'chapters')
+        read_only_fields = fields
+
 class StoryShareSerializer(serializers.ModelSerializer):
     shared_by_username = serializers.CharField(source='shared_by.username', read_only=True)
     story_title = serializers.CharField(source='story.title', read_only=True)
@@ -73,5 +186,5 @@ class StoryShareSerializer(serializers.ModelSerializer):
 class VoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vote
-        fields = ['id', 'choice', 'created_at']
-        read_only_fields = ['user']
+        fields = ['id', 'choice', 'decision_point', 'created_at']
+        read_only_fields = ['user', 'decision_point']
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserFollow
+from conf import images
+
+from . import search, tasks
+from .cache import invalidate_story
+from .models import Chapter, Choice, DecisionPoint, Story, StoryShare
+
+User = get_user_model()
+
+
+def _cascaded(instance, origin):
+    """Whether ``instance`` is being deleted along with a parent row
+
+    The receivers for the row the delete started from reindex and
+    invalidate the story once, so rows removed by the cascade skip their
+    own per-row work.
+    """
+    if origin is None or origin is instance:
+        return False
+    return not (isinstance(origin, QuerySet) and origin.model is type(instance))
+
+
+@receiver(post_save, sender=Story)
+def index_story(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.index_stories.enqueue([instance.pk])
+
+
+@receiver(post_delete, sender=Story)
+def unindex_story(sender, instance, **kwargs):
+    tasks.remove_stories.enqueue([instance.pk])
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def reindex_chapter_story(sender, instance, raw=False, origin=None, **kwargs):
+    if not raw and not _cascaded(instance, origin):
+        tasks.index_stories.enqueue([instance.story_id])
+
+
+def create_search_index(sender, **kwargs):
+    search.get_backend(require_index=False).ensure_index()
+
+
+def _story_slugs(**lookup):
+    return Story.objects.filter(**lookup).values_list('slug', flat=True)
+
+
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_story_cache(sender, instance, **kwargs):
+    invalidate_story(instance.slug)
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def invalidate_chapter_cache(sender, instance, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    Story.objects.filter(pk=instance.story_id).touch()
+    # Chapter counts appear on feed cards, so feeds are invalidated too
+    for slug in _story_slugs(pk=instance.story_id):
+        invalidate_story(slug)
+
+
+@receiver(post_save, sender=DecisionPoint)
+@receiver(post_delete, sender=DecisionPoint)
+def invalidate_decision_point_cache(sender, instance, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    Story.objects.filter(chapters=instance.chapter_id).touch()
+    for slug in _story_slugs(chapters=instance.chapter_id):
+        invalidate_story(slug, lists=False)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_choice_cache(sender, instance, origin=None, **kwargs):
+    if _cascaded(instance, origin):
+        return
+    Story.objects.filter(chapters__decision_points=instance.decision_point_id).touch()
+    for slug in _story_slugs(chapters__decision_points=instance.decision_point_id):
+        invalidate_story(slug, lists=False)
+
+
+@receiver(post_save, sender=StoryShare)
+def invalidate_share_cache(sender, instance, created, **kwargs):
+    if created:
+        for slug in _story_slugs(pk=instance.story_id):
+            invalidate_story(slug, lists=False)
+
+
+@receiver(m2m_changed, sender=Story.likes.through)
+def recount_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count likes added or removed through the ORM, e.g. ``story.likes.add()``
+
+    The like views write the through table directly and keep the counter
+    with F() updates, so they don't come through here.
+    """
+    if reverse and action == 'pre_clear':
+        # The cleared stories can't be looked up once their rows are gone
+        instance._cleared_story_ids = list(instance.liked_stories.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        story_ids = pk_set if action != 'post_clear' else instance.__dict__.pop('_cleared_story_ids', [])
+        Story.objects.filter(pk__in=story_ids or []).recount_likes()
+        for slug in _story_slugs(pk__in=story_ids or []):
+            invalidate_story(slug, lists=False)
+    else:
+        Story.objects.filter(pk=instance.pk).recount_likes()
+        invalidate_story(instance.slug, lists=False)
+
+
+@receiver(post_init, sender=Story)
+def remember_published_state(sender, instance, **kwargs):
+    # Read through __dict__ so a deferred is_published isn't fetched; an
+    # unknown state fans out again, which is harmless as inserts are idempotent.
+    instance._was_published = instance.__dict__.get('is_published') if instance.pk else False
+
+
+@receiver(post_save, sender=Story)
+def fan_out_published_story(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_published and not instance._was_published:
+        tasks.fan_out_story.enqueue(instance.pk)
+    instance._was_published = instance.is_published
+
+
+@receiver(post_save, sender=Story)
+def count_created_story(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        User.objects.filter(pk=instance.author_id).update(stories_count=F('stories_count') + 1)
+
+
+@receiver(post_delete, sender=Story)
+def count_deleted_story(sender, instance, origin=None, **kwargs):
+    # A deleted author takes their counter with them. Rows counted before
+    # the column existed read 0 until reconcile_counters backfills them, so
+    # the decrement never goes below zero.
+    if _cascaded(instance, origin):
+        return
+    User.objects.filter(pk=instance.author_id, stories_count__gt=0).update(
+        stories_count=F('stories_count') - 1
+    )
+
+
+@receiver(post_save, sender=UserFollow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.backfill_follow.enqueue(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=UserFollow)
+def prune_feed(sender, instance, origin=None, **kwargs):
+    # A deleted user's feed entries and stories go with the cascade
+    if _cascaded(instance, origin):
+        return
+    tasks.remove_follow.enqueue(instance.follower_id, instance.following_id)
+
+
+def cover_rendered(story_id):
+    Story.objects.filter(pk=story_id).touch()
+    for slug in _story_slugs(pk=story_id):
+        invalidate_story(slug)
+
+
+images.register(Story, 'cover_image', {
+    'cover_thumbnail': (640, 360),
+    'cover_medium': (1280, 720),
+}, on_render=cover_rendered)
+post_init.connect(images.remember_source, sender=Story)
+post_save.connect(images.queue_variants, sender=Story)
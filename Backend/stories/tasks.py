@@ -0,0 +1,36 @@
+"""
+Background tasks for story side effects, queued from ``stories/signals.py``.
+"""
+from jobs.queue import task
+
+from . import feed, search
+from .models import Story
+
+
+# Signals queue one call per written row; while one is waiting for a
+# worker, further writes to the same story need no call of their own
+@task('stories.index_stories', unique=True)
+def index_stories(story_ids):
+    search.get_backend().index(story_ids)
+
+
+@task('stories.remove_stories')
+def remove_stories(story_ids):
+    search.get_backend().remove(story_ids)
+
+
+@task('stories.fan_out_story')
+def fan_out_story(story_id):
+    story = Story.objects.filter(pk=story_id).only('pk', 'author_id', 'is_published', 'created_at').first()
+    if story is not None:
+        feed.fan_out_story(story)
+
+
+@task('stories.backfill_follow')
+def backfill_follow(follower_id, author_id):
+    feed.backfill_follow(follower_id, author_id)
+
+
+@task('stories.remove_follow')
+def remove_follow(follower_id, author_id):
+    feed.remove_follow(follower_id, author_id)
@@ -1,3 +1,1103 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient
+
+from conf.asgi import application
+from conf.middleware import RequestProfilingMiddleware
+
+from accounts.models import UserFollow
+from jobs.models import Job
+
+from . import search
+from .cache import LIST_NAMESPACE, get_version
+from .models import Chapter, Choice, DecisionPoint, FeedEntry, Story, StoryShare, TrendingScore, Vote
+from .realtime import tally_broadcaster
+from .trending import compute_trending
+from .vote_buffer import vote_buffer
+
+User = get_user_model()
+
+
+def run_jobs():
+    call_command('run_jobs', '--once', stdout=StringIO())
+
+
+class StoryCounterTests(TestCase):
+    """Stored like/share counters stay in step with the underlying rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.story = Story.objects.create(
+            title='Counter Story',
+            description='A story',
+            content='Once upon a time',
+            author=self.author,
+        )
+        self.client.force_authenticate(self.reader)
+
+    def test_like_toggle_updates_counter(self):
+        url = f'/api/stories/{self.story.slug}/like/'
+
+        response = self.client.post(url)
+        self.assertEqual(response.data['likes_count'], 1)
+        self.assertTrue(response.data['liked'])
+
+        response = self.client.post(url)
+        self.assertEqual(response.data['likes_count'], 0)
+        self.assertFalse(response.data['liked'])
+
+    def test_put_and_delete_are_idempotent(self):
+        url = f'/api/stories/{self.story.slug}/like/'
+
+        self.client.put(url)
+        # story id, rejected insert inside a savepoint, counter read
+        with self.assertNumQueries(6):
+            response = self.client.put(url)
+        self.assertEqual(response.data['likes_count'], 1)
+        self.assertTrue(response.data['liked'])
+
+        self.client.delete(url)
+        response = self.client.delete(url)
+        self.assertEqual(response.data['likes_count'], 0)
+        self.assertFalse(response.data['liked'])
+
+    def test_likes_added_through_the_orm_are_counted(self):
+        self.story.likes.add(self.reader)
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.likes_count, 1)
+
+        response = self.client.delete(f'/api/stories/{self.story.slug}/like/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['likes_count'], 0)
+
+    def test_unliking_an_uncounted_like_recounts(self):
+        # A like from before the counter existed
+        self.story.likes.add(self.reader)
+        Story.objects.filter(pk=self.story.pk).update(likes_count=0)
+
+        response = self.client.post(f'/api/stories/{self.story.slug}/like/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['liked'])
+        self.assertEqual(response.data['likes_count'], 0)
+
+    def test_share_counts_each_platform_once(self):
+        url = f'/api/stories/{self.story.slug}/share/'
+
+        self.client.post(url, {'platform': 'twitter'})
+        self.client.post(url, {'platform': 'twitter'})
+        response = self.client.post(url, {'platform': 'email'})
+
+        self.assertEqual(response.data['shares_count'], 2)
+
+    def test_reconcile_counters_repairs_drift(self):
+        self.story.likes.add(self.reader)
+        Story.objects.filter(pk=self.story.pk).update(likes_count=42, shares_count=7)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.likes_count, 1)
+        self.assertEqual(self.story.shares_count, 0)
+
+
+class StoryDeleteTests(TestCase):
+    """Deleting a story costs the same however many rows cascade from it"""
+
+    def delete_queries(self, chapters):
+        author = User.objects.create_user(username=f'author{chapters}', password='testpass123')
+        story = Story.objects.create(title='Doomed', description='d', content='c', author=author)
+        for order in range(1, chapters + 1):
+            chapter = Chapter.objects.create(story=story, title='Ch', content='c', order=order)
+            decision_point = DecisionPoint.objects.create(chapter=chapter, question='?')
+            Choice.objects.bulk_create([Choice(decision_point=decision_point, text=t) for t in 'ab'])
+
+        client = APIClient()
+        client.force_authenticate(author)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.delete(f'/api/stories/{story.slug}/')
+        self.assertEqual(response.status_code, 204)
+        return len(queries)
+
+    def test_cascade_receivers_do_not_run_per_row(self):
+        self.assertEqual(self.delete_queries(1), self.delete_queries(5))
+
+
+class StoryListTests(TestCase):
+    """Story feed serialization"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.stories = [
+            Story.objects.create(title=f'Story {i}', description='d', content='c', author=self.author)
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.reader)
+
+    def test_viewer_state_comes_from_page_level_lookups(self):
+        liked, shared, untouched = self.stories
+        liked.likes.add(self.reader)
+        StoryShare.objects.create(story=shared, shared_by=self.reader, platform='email')
+
+        response = self.client.get('/api/stories/')
+
+        state = {
+            item['slug']: (item['is_liked'], item['is_shared'], item['can_edit'])
+            for item in response.data['results']
+        }
+        self.assertEqual(state[liked.slug], (True, False, False))
+        self.assertEqual(state[shared.slug], (False, True, False))
+        self.assertEqual(state[untouched.slug], (False, False, False))
+
+    def test_list_uses_summary_fields_and_constant_queries(self):
+        for story in self.stories:
+            Chapter.objects.create(story=story, title='One', content='c' * 1000, order=1)
+
+        # page rows, liked ids, shared ids
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/stories/')
+
+        item = response.data['results'][0]
+        self.assertEqual(item['chapters_count'], 1)
+        self.assertEqual(item['excerpt'], 'd')
+        self.assertNotIn('content', item)
+        self.assertNotIn('chapters', item)
+
+
+    def test_feed_pages_by_cursor(self):
+        response = self.client.get('/api/stories/', {'page_size': 2})
+        first_page = [item['slug'] for item in response.data['results']]
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        second_page = [item['slug'] for item in response.data['results']]
+
+        self.assertEqual(first_page + second_page, [story.slug for story in reversed(self.stories)])
+        self.assertIsNone(response.data['next'])
+
+    def test_cursor_keys_on_id_when_created_at_ties(self):
+        Story.objects.update(created_at=timezone.now())
+        expected = [story.slug for story in reversed(self.stories)]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/stories/', {'page_size': 1})
+            slugs = [item['slug'] for item in response.data['results']]
+            while response.data['next']:
+                response = self.client.get(response.data['next'])
+                slugs += [item['slug'] for item in response.data['results']]
+        self.assertEqual(slugs, expected)
+        self.assertFalse([q for q in queries.captured_queries if 'OFFSET' in q['sql']])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([item['slug'] for item in response.data['results']], expected[1:2])
+
+
+class StorySlugTests(TestCase):
+    """Slugs are claimed by the unique index rather than checked up front"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+
+    def test_create_does_not_look_up_the_slug(self):
+        with CaptureQueriesContext(connection) as queries:
+            story = Story.objects.create(title='Fresh Title', description='d', content='c', author=self.author)
+        self.assertEqual(story.slug, 'fresh-title')
+        self.assertFalse([q for q in queries.captured_queries if '"stories_story"."slug" =' in q['sql']])
+
+    def test_collision_retries_with_a_suffix(self):
+        first = Story.objects.create(title='Same Title', description='d', content='c', author=self.author)
+        second = Story.objects.create(title='Same Title', description='d', content='c', author=self.author)
+        self.assertEqual(first.slug, 'same-title')
+        self.assertRegex(second.slug, r'^same-title-[0-9a-f]{8}$')
+        self.assertEqual(Story.objects.count(), 2)
+
+    def test_long_titles_leave_room_for_the_suffix(self):
+        story = Story.objects.create(title='word ' * 30, description='d', content='c', author=self.author)
+        Story.objects.create(title='word ' * 30, description='d', content='c', author=self.author)
+        self.assertLessEqual(len(story.slug), 41)
+        self.assertEqual(Story.objects.filter(slug__startswith=story.slug).count(), 2)
+
+    def test_bulk_create_assigns_unique_slugs_in_one_lookup(self):
+        Story.objects.create(title='Imported', description='d', content='c', author=self.author)
+        with self.assertNumQueries(2):
+            stories = Story.objects.bulk_create([
+                Story(title=title, description='d', content='c', author=self.author)
+                for title in ['Imported', 'Imported', 'Other']
+            ])
+        slugs = [story.slug for story in stories]
+        self.assertEqual(len(set(slugs)), 3)
+        self.assertEqual(slugs[2], 'other')
+        self.assertTrue(all(slug.startswith('imported-') for slug in slugs[:2]))
+
+    def test_bulk_create_keeps_slugs_unique_across_lookup_chunks(self):
+        stories = Story.objects.bulk_create([
+            Story(title='Repeated' if i in (0, 600) else f'Title {i}', description='d', content='c', author=self.author)
+            for i in range(601)
+        ])
+        self.assertEqual(stories[0].slug, 'repeated')
+        self.assertRegex(stories[600].slug, r'^repeated-[0-9a-f]{8}$')
+
+    def test_titles_matching_collection_routes_get_a_suffix(self):
+        story = Story.objects.create(title='Search', description='d', content='c', author=self.author)
+        imported = Story.objects.bulk_create([
+            Story(title=title, description='d', content='c', author=self.author)
+            for title in ['Feed', 'Trending']
+        ])
+        for obj, base in zip([story, *imported], ['search', 'feed', 'trending']):
+            self.assertRegex(obj.slug, rf'^{base}-[0-9a-f]{{8}}$')
+
+        response = APIClient().get(f'/api/stories/{story.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Search')
+
+
+class StorySearchTests(TestCase):
+    """Full-text search index stays in sync with stories and chapters"""
+
+    def setUp(self):
+        self.client = APIClient()
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.dragon = Story.objects.create(
+            title='The Dragon Keeper', description='A quiet village', content='c', author=author
+        )
+        self.sea = Story.objects.create(
+            title='Open Sea', description='Sailing <south>', content='c', author=author
+        )
+        run_jobs()
+
+    def test_search_ranks_and_highlights_matches(self):
+        response = self.client.get('/api/stories/search/', {'q': 'dragon'})
+
+        self.assertEqual([item['slug'] for item in response.data], [self.dragon.slug])
+        self.assertIn('<mark>Dragon</mark>', response.data[0]['snippet'])
+
+    def test_chapter_text_is_indexed_and_snippets_are_escaped(self):
+        Chapter.objects.create(story=self.sea, title='Storm', content='A kraken rises <b>', order=1)
+        run_jobs()
+
+        response = self.client.get('/api/stories/search/', {'q': 'kraken'})
+
+        self.assertEqual([item['slug'] for item in response.data], [self.sea.slug])
+        self.assertIn('&lt;b&gt;', response.data[0]['snippet'])
+
+    def test_feed_search_parameter_uses_index(self):
+        response = self.client.get('/api/stories/', {'search': 'sail'})
+        self.assertEqual([item['slug'] for item in response.data['results']], [self.sea.slug])
+
+        self.sea.delete()
+        run_jobs()
+        response = self.client.get('/api/stories/', {'search': 'sail'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_chapter_writes_queue_one_reindex_per_story(self):
+        for order in range(1, 4):
+            Chapter.objects.create(story=self.sea, title='Storm', content='c', order=order)
+        self.assertEqual(Job.objects.filter(name='stories.index_stories').count(), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', "Drops the SQLite FTS table")
+    def test_missing_index_falls_back_to_unindexed_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {search.SQLiteSearchBackend.table}")
+        search._indexed_aliases.clear()
+        self.addCleanup(search._indexed_aliases.clear)
+
+        with self.assertLogs('stories.search', 'WARNING'):
+            Story.objects.create(title='Dragon Eggs', description='d', content='c', author=self.sea.author)
+            run_jobs()
+            response = self.client.get('/api/stories/search/', {'q': 'dragon'})
+
+        self.assertFalse(Job.objects.filter(status=Job.FAILED).exists())
+        self.assertEqual(len(response.data), 2)
+
+
+class ResponseCacheTests(TestCase):
+    """Anonymous responses are cached and dropped when the data changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Cached', description='d', content='c', author=self.author)
+
+    def test_feed_is_served_from_cache_until_a_story_changes(self):
+        self.client.get('/api/stories/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/stories/')
+
+        Story.objects.create(title='Fresh', description='d', content='c', author=self.author)
+        response = self.client.get('/api/stories/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_like_invalidates_story_detail(self):
+        url = f'/api/stories/{self.story.slug}/'
+        self.assertEqual(self.client.get(url).data['likes_count'], 0)
+
+        reader = APIClient()
+        reader.force_authenticate(User.objects.create_user(username='reader', password='testpass123'))
+        reader.post(f'{url}like/')
+
+        self.assertEqual(self.client.get(url).data['likes_count'], 1)
+
+    def test_likes_and_shares_leave_cached_feeds_alone(self):
+        self.client.get('/api/stories/')
+
+        reader = APIClient()
+        reader.force_authenticate(User.objects.create_user(username='reader', password='testpass123'))
+        self.assertEqual(reader.post(f'/api/stories/{self.story.slug}/like/').status_code, 200)
+        self.assertEqual(
+            reader.post(f'/api/stories/{self.story.slug}/share/', {'platform': 'email'}).status_code, 201
+        )
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/stories/')
+
+    def test_evicted_versions_never_revive_old_entries(self):
+        version = get_version(LIST_NAMESPACE)
+        caches['versions'].clear()
+        self.assertGreater(get_version(LIST_NAMESPACE), version)
+
+
+class ConditionalGetTests(TestCase):
+    """Story and chapter endpoints honour If-None-Match"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Serial', description='d', content='c', author=author)
+        self.chapter = Chapter.objects.create(story=self.story, title='One', content='c', order=1)
+
+    def test_unchanged_chapters_return_304(self):
+        url = f'/api/stories/{self.story.slug}/chapters/'
+        etag = self.client.get(url)['ETag']
+
+        # validator aggregate only
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Chapter.objects.create(story=self.story, title='Two', content='c', order=2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_decision_point_changes_story_etag(self):
+        url = f'/api/stories/{self.story.slug}/'
+        etag = self.client.get(url)['ETag']
+
+        DecisionPoint.objects.create(chapter=self.chapter, question='?')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['chapters'][0]['decision_points']), 1)
+
+    @override_settings(STORIES_TALLY_BROADCAST_INTERVAL=0)
+    def test_votes_change_both_validators_without_the_cache(self):
+        url = f'/api/stories/{self.story.slug}/'
+        choice = Choice.objects.create(
+            decision_point=DecisionPoint.objects.create(chapter=self.chapter, question='?'), text='Go'
+        )
+        Story.objects.filter(pk=self.story.pk).update(revised_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        voter = APIClient()
+        voter.force_authenticate(User.objects.create_user(username='voter', password='testpass123'))
+        # The story is marked revised by the tally broadcast after commit
+        with self.captureOnCommitCallbacks(execute=True):
+            voter.post(
+                f'{url}chapters/{self.chapter.pk}/decision-points/{choice.decision_point_id}/vote/',
+                {'choice': choice.pk}, format='json'
+            )
+        # As if the cache version bump happened in another process
+        cache.clear()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_unpublished_stories_are_not_revealed(self):
+        Story.objects.filter(pk=self.story.pk).update(is_published=False)
+        response = self.client.get(
+            f'/api/stories/{self.story.slug}/',
+            HTTP_IF_MODIFIED_SINCE=http_date((timezone.now() + timedelta(days=1)).timestamp())
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ChapterContentTests(TestCase):
+    """Chapter listings carry metadata only; bodies come from the content endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Serial', description='d', content='c', author=author)
+        self.chapter = Chapter.objects.create(story=self.story, title='One', content='word ' * 2000, order=1)
+
+    def test_listings_omit_chapter_bodies(self):
+        for url in [
+            f'/api/stories/{self.story.slug}/',
+            f'/api/stories/{self.story.slug}/tree/',
+        ]:
+            chapter = self.client.get(url).data['chapters'][0]
+            self.assertNotIn('content', chapter)
+            self.assertEqual(chapter['content_length'], 10000)
+
+        chapter = self.client.get(f'/api/stories/{self.story.slug}/chapters/').data['results'][0]
+        self.assertNotIn('content', chapter)
+
+    def test_content_endpoint_serves_one_body_compressed(self):
+        url = f'/api/stories/{self.story.slug}/chapters/{self.chapter.pk}/content/'
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), 1000)
+        self.assertEqual(self.client.get(url).data['content'], self.chapter.content)
+
+
+class ChapterBulkTests(TestCase):
+    """Many chapters are created, edited and reordered in one request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Serial', description='d', content='c', author=self.author)
+        self.chapters = [
+            Chapter.objects.create(story=self.story, title=f'Part {order}', content=f'Body {order}', order=order)
+            for order in (1, 2, 3)
+        ]
+        self.url = f'/api/stories/{self.story.slug}/chapters/bulk/'
+        self.client.force_authenticate(self.author)
+
+    def outline(self):
+        return list(Chapter.objects.filter(story=self.story).order_by('order').values_list('title', 'content', 'order'))
+
+    def test_insert_in_the_middle_shifts_later_chapters(self):
+        first, second, third = self.chapters
+        response = self.client.post(self.url, {'chapters': [
+            {'id': third.pk, 'order': 4},
+            {'id': second.pk, 'order': 3},
+            {'id': first.pk, 'title': 'Prologue'},
+            {'title': 'Interlude', 'content': 'Meanwhile', 'order': 2},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([chapter['title'] for chapter in response.data], ['Prologue', 'Interlude', 'Part 2', 'Part 3'])
+        self.assertEqual(self.outline(), [
+            ('Prologue', 'Body 1', 1), ('Interlude', 'Meanwhile', 2), ('Part 2', 'Body 2', 3), ('Part 3', 'Body 3', 4),
+        ])
+
+    def test_swapping_orders_does_not_collide(self):
+        first, second, _ = self.chapters
+        response = self.client.post(self.url, {'chapters': [
+            {'id': first.pk, 'order': 2}, {'id': second.pk, 'order': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([title for title, _, _ in self.outline()], ['Part 2', 'Part 1', 'Part 3'])
+
+    def test_rejected_requests_change_nothing(self):
+        first, second, _ = self.chapters
+        before = self.outline()
+        for chapters in (
+            [{'id': first.pk, 'order': 3}],
+            [{'title': 'Extra', 'content': 'c', 'order': 2}],
+            [{'id': 999, 'title': 'Missing'}],
+            [{'id': first.pk, 'order': 5}, {'id': first.pk, 'order': 6}],
+            [{'title': 'No body', 'order': 9}],
+        ):
+            response = self.client.post(self.url, {'chapters': chapters}, format='json')
+            self.assertEqual(response.status_code, 400, chapters)
+        self.assertEqual(self.outline(), before)
+
+    def test_only_the_author_can_bulk_edit(self):
+        self.client.force_authenticate(User.objects.create_user(username='reader', password='testpass123'))
+        response = self.client.post(self.url, {'chapters': [{'id': self.chapters[0].pk, 'title': 'Mine'}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ImageVariantTests(TestCase):
+    """Uploaded covers get resized variants that the serializers prefer"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+
+    def upload(self, size=(2000, 1500)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'purple').save(buffer, format='PNG')
+        return SimpleUploadedFile('cover.png', buffer.getvalue(), content_type='image/png')
+
+    def test_cover_variants_are_rendered(self):
+        story = Story.objects.create(
+            title='Covered', description='d', content='c', author=self.author, cover_image=self.upload()
+        )
+        run_jobs()
+        story.refresh_from_db()
+
+        self.assertTrue(story.cover_thumbnail.name.endswith('_thumbnail.webp'))
+        with Image.open(story.cover_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (480, 360))
+
+        card = self.client.get('/api/stories/').data['results'][0]
+        self.assertTrue(card['cover_image'].endswith(story.cover_thumbnail.url))
+        detail = self.client.get(f'/api/stories/{story.slug}/').data
+        self.assertTrue(detail['cover_medium'].endswith(story.cover_medium.url))
+
+    def test_replacing_a_cover_resets_its_variants(self):
+        story = Story.objects.create(
+            title='Covered', description='d', content='c', author=self.author, cover_image=self.upload()
+        )
+        run_jobs()
+        story.refresh_from_db()
+        old_variants = [story.cover_thumbnail.name, story.cover_medium.name]
+
+        # The new upload is served as-is until the queued job renders it
+        story.cover_image = self.upload((300, 300))
+        with self.captureOnCommitCallbacks(execute=True):
+            story.save()
+        storage = story.cover_medium.storage
+        self.assertFalse(any(storage.exists(name) for name in old_variants))
+        self.assertTrue(Job.objects.filter(name='images.render_variants').exists())
+        detail = self.client.get(f'/api/stories/{story.slug}/').data
+        self.assertTrue(detail['cover_medium'].endswith(story.cover_image.url))
+
+        run_jobs()
+        story.refresh_from_db()
+        with Image.open(story.cover_medium.path) as medium:
+            self.assertEqual(medium.size, (300, 300))
+
+
+class FollowingFeedTests(TestCase):
+    """Following feeds are materialized on publish, or merged on read for big authors"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        UserFollow.objects.create(follower=self.reader, following=self.author)
+        self.client.force_authenticate(self.reader)
+
+    def feed_slugs(self):
+        return [item['slug'] for item in self.client.get('/api/stories/feed/').data['results']]
+
+    def publish(self, author, title):
+        story = Story.objects.create(title=title, description='d', content='c', author=author)
+        run_jobs()
+        return story
+
+    def test_publishing_fans_out_to_followers(self):
+        story = self.publish(self.author, 'Followed')
+        self.publish(self.other, 'Not followed')
+
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader, story=story).exists())
+        self.assertEqual(self.feed_slugs(), [story.slug])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        story = self.publish(self.other, 'Earlier')
+
+        UserFollow.objects.create(follower=self.reader, following=self.other)
+        run_jobs()
+        self.assertEqual(self.feed_slugs(), [story.slug])
+
+        UserFollow.objects.get(follower=self.reader, following=self.other).delete()
+        run_jobs()
+        self.assertEqual(self.feed_slugs(), [])
+
+    @override_settings(STORIES_FEED_FANOUT_LIMIT=0)
+    def test_large_authors_are_merged_on_read(self):
+        User.objects.filter(pk=self.author.pk).update(followers_count=1)
+        story = self.publish(self.author, 'Popular')
+
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_slugs(), [story.slug])
+
+    @override_settings(STORIES_FEED_FANOUT_LIMIT=5)
+    def test_pages_merge_materialized_and_read_time_stories(self):
+        User.objects.filter(pk=self.other.pk).update(followers_count=10)
+        UserFollow.objects.create(follower=self.reader, following=self.other)
+        stories = [self.publish(author, f'Story {i}') for i, author in enumerate([self.author, self.other] * 3)]
+
+        response = self.client.get('/api/stories/feed/', {'page_size': 4})
+        slugs = [item['slug'] for item in response.data['results']]
+        response = self.client.get(response.data['next'])
+        slugs += [item['slug'] for item in response.data['results']]
+
+        self.assertFalse(FeedEntry.objects.filter(story__author=self.other).exists())
+        self.assertEqual(slugs, [story.slug for story in reversed(stories)])
+        self.assertIsNone(response.data['next'])
+
+
+class TrendingTests(TestCase):
+    """Trending scores decay over time and are folded in incrementally"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.readers = [
+            User.objects.create_user(username=f'reader{i}', password='testpass123') for i in range(3)
+        ]
+        self.quiet = Story.objects.create(title='Quiet', description='d', content='c', author=self.author)
+        self.busy = Story.objects.create(title='Busy', description='d', content='c', author=self.author)
+
+    def trending_slugs(self):
+        return [item['slug'] for item in self.client.get('/api/stories/trending/').data]
+
+    def test_ranks_by_activity_and_decays(self):
+        for reader in self.readers:
+            StoryShare.objects.create(story=self.busy, shared_by=reader, platform='email')
+        Story.objects.filter(pk=self.quiet.pk).update(likes_count=1)
+
+        now = timezone.now()
+        compute_trending(now=now)
+        self.assertEqual(self.trending_slugs(), [self.busy.slug, self.quiet.slug])
+
+        first = TrendingScore.objects.get(story=self.busy).score
+        compute_trending(now=now + timedelta(hours=24))
+        self.assertAlmostEqual(TrendingScore.objects.get(story=self.busy).score, first / 2, places=3)
+
+    def test_likes_are_only_counted_once(self):
+        Story.objects.filter(pk=self.quiet.pk).update(likes_count=2)
+        now = timezone.now()
+
+        compute_trending(now=now)
+        compute_trending(now=now)
+
+        self.assertAlmostEqual(TrendingScore.objects.get(story=self.quiet).score, 2.0)
+
+    def test_pruning_keeps_the_likes_baseline(self):
+        Story.objects.filter(pk=self.quiet.pk).update(likes_count=100)
+        now = timezone.now()
+
+        compute_trending(now=now)
+        compute_trending(now=now + timedelta(days=15))
+        self.assertNotIn(self.quiet.slug, self.trending_slugs())
+
+        compute_trending(now=now + timedelta(days=15, hours=1))
+        row = TrendingScore.objects.get(story=self.quiet)
+        self.assertEqual((row.score, row.likes_seen), (0, 100))
+        self.assertNotIn(self.quiet.slug, self.trending_slugs())
+
+
+class StoryTreeTests(TestCase):
+    """The reader tree endpoint loads in a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Tree Story', description='d', content='c', author=author)
+
+    def add_chapters(self, count):
+        start = self.story.chapters.count()
+        for order in range(start + 1, start + count + 1):
+            chapter = Chapter.objects.create(story=self.story, title=f'Ch {order}', content='c', order=order)
+            active = DecisionPoint.objects.create(chapter=chapter, question='Which way?')
+            DecisionPoint.objects.create(chapter=chapter, question='Closed', is_active=False)
+            Choice.objects.create(decision_point=active, text='Left')
+            Choice.objects.create(decision_point=active, text='Right')
+
+    def test_query_count_does_not_grow_with_chapters(self):
+        url = f'/api/stories/{self.story.slug}/tree/'
+        self.add_chapters(2)
+        # story, chapters, decision points, choices
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        self.add_chapters(10)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+
+        chapters = response.data['chapters']
+        self.assertEqual([c['order'] for c in chapters], list(range(1, 13)))
+        self.assertEqual(len(chapters[0]['decision_points']), 1)
+        self.assertEqual(len(chapters[0]['decision_points'][0]['choices']), 2)
+
+
+class VoteCreateTests(TestCase):
+    """Votes are limited to one per decision point and tallied atomically"""
+
+    def setUp(self):
+        self.client = APIClient()
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.voter = User.objects.create_user(username='voter', password='testpass123')
+        story = Story.objects.create(title='Vote Story', description='d', content='c', author=author)
+        chapter = Chapter.objects.create(story=story, title='One', content='c', order=1)
+        self.decision_point = DecisionPoint.objects.create(chapter=chapter, question='Left or right?')
+        self.left = Choice.objects.create(decision_point=self.decision_point, text='Left')
+        self.right = Choice.objects.create(decision_point=self.decision_point, text='Right')
+        self.url = (
+            f'/api/stories/{story.slug}/chapters/{chapter.pk}/'
+            f'decision-points/{self.decision_point.pk}/vote/'
+        )
+        self.client.force_authenticate(self.voter)
+
+    def test_vote_returns_tallies(self):
+        response = self.client.post(self.url, {'choice': self.left.pk})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['choice_votes'], 1)
+        self.assertEqual(response.data['tallies'], {self.left.pk: 1, self.right.pk: 0})
+
+    def test_vote_does_not_update_the_story_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, {'choice': self.left.pk})
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "stories_story"')])
+
+    def test_second_vote_on_same_decision_point_is_rejected(self):
+        self.client.post(self.url, {'choice': self.left.pk})
+        response = self.client.post(self.url, {'choice': self.right.pk})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Vote.objects.filter(user=self.voter).count(), 1)
+        self.right.refresh_from_db()
+        self.assertEqual(self.right.votes, 0)
+
+    @override_settings(STORIES_VOTE_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': None})
+    def test_buffered_vote_is_visible_before_flush(self):
+        response = self.client.post(self.url, {'choice': self.left.pk})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['choice_votes'], 1)
+        self.assertFalse(Vote.objects.exists())
+
+        response = self.client.post(self.url, {'choice': self.right.pk})
+        self.assertEqual(response.status_code, 400)
+
+        choices_url = self.url.replace('/vote/', '/choices/')
+        response = self.client.get(choices_url)
+        self.assertEqual(response.data['results'][0]['votes'], 1)
+
+        self.assertEqual(vote_buffer.flush(), 1)
+        self.left.refresh_from_db()
+        self.assertEqual(self.left.votes, 1)
+        self.assertEqual(vote_buffer.pending_votes(self.left.pk), 0)
+
+    @override_settings(STORIES_VOTE_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': None})
+    def test_flush_increments_tallies_without_recounting(self):
+        # Stored tallies are trusted rather than recounted from every vote
+        Choice.objects.filter(pk=self.left.pk).update(votes=10)
+        others = [User.objects.create_user(username=f'other{i}', password='testpass123') for i in range(3)]
+        for voter in [self.voter, *others[:2]]:
+            vote_buffer.add(voter.pk, self.left.pk, self.decision_point.pk)
+        vote_buffer.add(others[2].pk, self.right.pk, self.decision_point.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(vote_buffer.flush(), 4)
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+
+        self.left.refresh_from_db()
+        self.right.refresh_from_db()
+        self.assertEqual((self.left.votes, self.right.votes), (13, 1))
+
+    @override_settings(STORIES_VOTE_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': None})
+    def test_flush_tallies_only_the_votes_it_inserted(self):
+        self.client.post(self.url, {'choice': self.left.pk})
+        bulk_create = Vote.objects.bulk_create
+
+        def racing_bulk_create(votes, **kwargs):
+            # A direct vote for the same user lands after the existence check
+            Vote.objects.create(user=self.voter, decision_point=self.decision_point, choice=self.right)
+            Choice.objects.filter(pk=self.right.pk).update(votes=F('votes') + 1)
+            return bulk_create(votes, **kwargs)
+
+        with mock.patch.object(Vote.objects, 'bulk_create', racing_bulk_create):
+            vote_buffer.flush()
+
+        self.left.refresh_from_db()
+        self.right.refresh_from_db()
+        self.assertEqual((self.left.votes, self.right.votes), (0, 1))
+
+    @override_settings(STORIES_VOTE_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': None})
+    def test_flush_drops_votes_for_deleted_decision_points(self):
+        other_point = DecisionPoint.objects.create(chapter=self.decision_point.chapter, question='Up or down?')
+        up = Choice.objects.create(decision_point=other_point, text='Up')
+        vote_buffer.add(self.voter.pk, self.left.pk, self.decision_point.pk)
+        vote_buffer.add(self.voter.pk, up.pk, other_point.pk)
+        self.decision_point.delete()
+
+        self.assertEqual(vote_buffer.flush(), 1)
+        up.refresh_from_db()
+        self.assertEqual(up.votes, 1)
+        self.assertEqual(list(Vote.objects.values_list('choice_id', flat=True)), [up.pk])
+        self.assertEqual(vote_buffer.pending_votes(self.left.pk), 0)
+        self.assertFalse(vote_buffer.has_vote(self.voter.pk, self.decision_point.pk))
+
+    @override_settings(STORIES_VOTE_BUFFER={'ENABLED': True, 'FLUSH_INTERVAL': None, 'MAX_RETRIES': 1})
+    def test_failing_batch_is_dropped_after_max_retries(self):
+        vote_buffer.add(self.voter.pk, self.left.pk, self.decision_point.pk)
+
+        with mock.patch.object(Vote.objects, 'bulk_create', side_effect=RuntimeError), \
+                self.assertLogs('stories.vote_buffer', 'ERROR'):
+            vote_buffer.flush()
+            self.assertEqual(vote_buffer.pending_votes(self.left.pk), 1)
+            vote_buffer.flush()
+
+        self.assertEqual(vote_buffer.pending_votes(self.left.pk), 0)
+        self.assertFalse(vote_buffer.has_vote(self.voter.pk, self.decision_point.pk))
+        self.assertEqual(vote_buffer.flush(), 0)
+
+
+@override_settings(STORIES_TALLY_BROADCAST_INTERVAL=0)
+class TallyBroadcastTests(TransactionTestCase):
+    """Votes are pushed to WebSocket subscribers of the decision point"""
+
+    def setUp(self):
+        author = User.objects.create_user(username='author', password='testpass123')
+        self.voter = User.objects.create_user(username='voter', password='testpass123')
+        story = Story.objects.create(title='Live Story', description='d', content='c', author=author)
+        chapter = Chapter.objects.create(story=story, title='One', content='c', order=1)
+        self.decision_point = DecisionPoint.objects.create(chapter=chapter, question='Left or right?')
+        self.choice = Choice.objects.create(decision_point=self.decision_point, text='Left')
+        self.vote_url = (
+            f'/api/stories/{story.slug}/chapters/{chapter.pk}/'
+            f'decision-points/{self.decision_point.pk}/vote/'
+        )
+
+    def vote(self, voter=None):
+        client = APIClient()
+        client.force_authenticate(voter or self.voter)
+        return client.post(self.vote_url, {'choice': self.choice.pk})
+
+    async def subscribe(self):
+        communicator = WebsocketCommunicator(
+            application, f'/ws/decision-points/{self.decision_point.pk}/',
+            headers=[(b'origin', b'http://localhost')]
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        initial = await communicator.receive_json_from()
+        self.assertEqual(initial['tallies'], {str(self.choice.pk): 0})
+        return communicator
+
+    def test_subscriber_receives_initial_and_updated_tallies(self):
+        async def scenario():
+            communicator = await self.subscribe()
+
+            await database_sync_to_async(self.vote)()
+            update = await communicator.receive_json_from(timeout=5)
+            self.assertEqual(update['tallies'], {str(self.choice.pk): 1})
+
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    @override_settings(STORIES_TALLY_BROADCAST_INTERVAL=0.5)
+    def test_votes_within_the_interval_are_coalesced(self):
+        voters = [
+            User.objects.create_user(username=f'voter{i}', password='testpass123') for i in range(3)
+        ]
+
+        async def scenario():
+            communicator = await self.subscribe()
+
+            for voter in voters:
+                response = await database_sync_to_async(self.vote)(voter)
+                self.assertEqual(response.status_code, 201)
+            update = await communicator.receive_json_from(timeout=5)
+            self.assertEqual(update['tallies'], {str(self.choice.pk): 3})
+            self.assertTrue(await communicator.receive_nothing(timeout=1))
+
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    @override_settings(STORIES_TALLY_BROADCAST_INTERVAL=0.5)
+    def test_votes_are_coalesced_without_a_consumer_loop(self):
+        voters = [
+            User.objects.create_user(username=f'voter{i}', password='testpass123') for i in range(3)
+        ]
+        broadcast = threading.Event()
+
+        with mock.patch.object(tally_broadcaster, '_loop', None), \
+                mock.patch.object(tally_broadcaster, 'broadcast', side_effect=lambda _: broadcast.set()) as send:
+            for voter in voters:
+                self.assertEqual(self.vote(voter).status_code, 201)
+            self.assertEqual(send.call_count, 0)
+            self.assertTrue(broadcast.wait(timeout=5))
+
+        send.assert_called_once_with(self.decision_point.pk)
+
+
+class RequestProfilingTests(TestCase):
+    """The profiling middleware reports timings and flags repeated queries"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(title='Profiled', description='d', content='c', author=self.author)
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'SAMPLE_RATE': 1.0})
+    def test_sampled_requests_get_server_timing(self):
+        response = APIClient().get(f'/api/stories/{self.story.slug}/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", view;dur=')
+        self.assertNotIn('dup;', response['Server-Timing'])
+
+    @override_settings(REQUEST_PROFILING={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'DUPLICATE_QUERY_THRESHOLD': 3})
+    def test_repeated_queries_are_flagged(self):
+        def get_response(request):
+            for _ in range(3):
+                Story.objects.filter(pk=self.story.pk).exists()
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(get_response)
+        with self.assertLogs('conf.middleware', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/repeated/'))
+        self.assertIn('dup;dur=0.0;desc="1 repeated queries"', response['Server-Timing'])
+        self.assertIn('Possible N+1 on GET /repeated/: query ran 3 times', logs.output[0])
+
+    def test_disabled_by_default(self):
+        response = APIClient().get(f'/api/stories/{self.story.slug}/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class SyntheticDataTests(TestCase):
+    """The synthetic data generator produces a consistent, reproducible dataset"""
+
+    def generate(self, prefix):
+        call_command(
+            'generate_synthetic_data', '--users=60', '--follows=400', '--stories=40', '--votes=300',
+            '--likes=300', '--shares=50', '--author-ratio=0.2', '--seed=7', f'--prefix={prefix}',
+            stdout=StringIO()
+        )
+        return Story.objects.filter(author__username__startswith=prefix)
+
+    def test_generated_rows_have_consistent_counters_and_feeds(self):
+        stories = self.generate('synth')
+
+        self.assertEqual(stories.count(), 40)
+        self.assertTrue(Chapter.objects.filter(story__in=stories).exists())
+        story = stories.order_by('-likes_count').first()
+        self.assertEqual(story.likes_count, story.likes.count())
+        self.assertGreater(story.likes_count, 0)
+        self.assertEqual(
+            sum(Choice.objects.values_list('votes', flat=True)), Vote.objects.count()
+        )
+        self.assertTrue(FeedEntry.objects.exists())
+
+        output = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=output)
+        self.assertNotIn('drifted', output.getvalue())
+
+    def test_same_seed_generates_the_same_shape(self):
+        first = list(self.generate('one').order_by('pk').values_list('title', 'likes_count'))
+        second = list(self.generate('two').order_by('pk').values_list('title', 'likes_count'))
+        self.assertEqual(first, second)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+class QueryPlanTests(TestCase):
+    """List endpoints are served by the indexes declared for them"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.story = Story.objects.create(
+            title='Indexed', description='d', content='c', author=self.author, category='fantasy'
+        )
+        self.chapter = Chapter.objects.create(story=self.story, title='One', content='c', order=1)
+
+    def query_plans(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                    plans.append('\n'.join(row[-1] for row in cursor.fetchall()))
+        self.assertTrue(plans, f"No query against {table} for {url}")
+        return '\n'.join(plans)
+
+    def assertUsesIndex(self, url, table, index):
+        plan = self.query_plans(url, table)
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index}\b')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_feed(self):
+        self.assertUsesIndex('/api/stories/', 'stories_story', 'story_published_created_idx')
+
+    def test_following_feed(self):
+        reader = User.objects.create_user(username='reader', password='testpass123')
+        FeedEntry.objects.create(user=reader, story=self.story, created_at=self.story.created_at)
+        self.client.force_authenticate(reader)
+        self.assertUsesIndex('/api/stories/feed/', 'stories_feedentry', 'feedentry_user_created_idx')
+
+    def test_category_feed(self):
+        self.assertUsesIndex(
+            '/api/stories/?category=fantasy', 'stories_story', 'story_category_created_idx'
+        )
+
+    def test_user_stories(self):
+        self.assertUsesIndex(
+            f'/api/stories/user/{self.author.username}/', 'stories_story', 'story_author_created_idx'
+        )
+
+    def test_active_decision_points(self):
+        self.assertUsesIndex(
+            f'/api/stories/{self.story.slug}/chapters/{self.chapter.pk}/decision-points/',
+            'stories_decisionpoint', 'decisionpoint_active_idx'
+        )
+
+    def test_trending(self):
+        compute_trending()
+        self.assertUsesIndex('/api/stories/trending/', 'stories_trendingscore', 'trendingscore_score_idx')
+
+    def test_trending_run_reads_only_new_activity(self):
+        compute_trending()
+        with CaptureQueriesContext(connection) as queries:
+            compute_trending()
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT') and 'trendingrun' not in query['sql']:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                    plans.append('\n'.join(row[-1] for row in cursor.fetchall()))
+        plan = '\n'.join(plans)
+        for table, index in [
+            ('stories_storyshare', 'storyshare_shared_idx'),
+            ('stories_vote', 'vote_created_idx'),
+            ('stories_chapter', 'chapter_created_idx'),
+            ('stories_story', 'story_revised_idx'),
+        ]:
+            self.assertRegex(plan, rf'SEARCH {table} USING (COVERING )?INDEX {index}\b')
+        self.assertNotRegex(plan, r'SCAN stories_(storyshare|vote|chapter|story)\b')
+
+    def test_story_shares(self):
+        self.client.force_authenticate(self.author)
+        self.assertUsesIndex(
+            f'/api/stories/{self.story.slug}/shares/', 'stories_storyshare', 'storyshare_story_shared_idx'
+        )
@@ -0,0 +1,134 @@
+"""
+Trending story scores.
+
+Each story's score is a sum of weighted activity (likes, shares, votes,
+new chapters) where every event decays exponentially with
+``HALF_LIFE_HOURS``. Because the decay is exponential, a run only needs to
+scale every stored score by the decay since the previous run and add the
+activity that happened in between, so ``compute_trending`` never rescans
+old activity. The trending endpoint then just reads scores in index order.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import LIST_NAMESPACE, bump_version
+from .models import Chapter, Story, StoryShare, TrendingRun, TrendingScore, Vote
+
+DEFAULTS = {
+    'HALF_LIFE_HOURS': 24,
+    # How far back the first run looks when there is no previous run
+    'INITIAL_WINDOW_DAYS': 7,
+    # Scores that decay below this drop out of trending. The row is kept,
+    # zeroed, while it still holds a likes baseline.
+    'MIN_SCORE': 0.01,
+    'WEIGHTS': {
+        'like': 1.0,
+        'share': 3.0,
+        'vote': 0.5,
+        'chapter': 5.0,
+    },
+}
+
+
+def trending_settings():
+    return {**DEFAULTS, **getattr(settings, 'STORIES_TRENDING', {})}
+
+
+def decay_factor(seconds, half_life_hours):
+    return math.pow(0.5, max(seconds, 0) / (half_life_hours * 3600))
+
+
+def compute_trending(now=None, batch_size=1000):
+    """Fold activity since the last run into the stored scores
+
+    Returns the number of stories whose score received new activity.
+    """
+    config = trending_settings()
+    weights = config['WEIGHTS']
+    half_life = config['HALF_LIFE_HOURS']
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        last_run = TrendingRun.objects.select_for_update().first()
+        since = last_run.computed_at if last_run else now - timedelta(days=config['INITIAL_WINDOW_DAYS'])
+
+        # Existing scores all decay by the same factor since the last run
+        if last_run:
+            TrendingScore.objects.filter(score__gt=0).update(
+                score=F('score') * decay_factor((now - since).total_seconds(), half_life)
+            )
+
+        gained = defaultdict(float)
+
+        def add_events(weight, events):
+            for story_id, happened_at in events.iterator(chunk_size=batch_size):
+                gained[story_id] += weight * decay_factor((now - happened_at).total_seconds(), half_life)
+
+        add_events(weights['share'], StoryShare.objects.filter(
+            shared_at__gt=since, shared_at__lte=now
+        ).values_list('story_id', 'shared_at'))
+        add_events(weights['vote'], Vote.objects.filter(
+            created_at__gt=since, created_at__lte=now
+        ).values_list('decision_point__chapter__story_id', 'created_at'))
+        add_events(weights['chapter'], Chapter.objects.filter(
+            created_at__gt=since, created_at__lte=now
+        ).values_list('story_id', 'created_at'))
+
+        # Likes have no timestamp; count growth since the last run as new
+        # now. Every counter change touches the story, so after the first
+        # run only stories revised since the last one can have grown.
+        stories = Story.objects.filter(revised_at__gt=since) if last_run else Story.objects.all()
+        likes = {}
+        for story_id, likes_count, likes_seen in stories.exclude(
+            trending__likes_seen=F('likes_count')
+        ).exclude(
+            likes_count=0, trending__isnull=True
+        ).values_list('pk', 'likes_count', 'trending__likes_seen').iterator(chunk_size=batch_size):
+            likes[story_id] = likes_count
+            new_likes = likes_count - (likes_seen or 0)
+            if new_likes > 0:
+                gained[story_id] += weights['like'] * new_likes
+
+        touched = list(set(gained) | set(likes))
+        for start in range(0, len(touched), batch_size):
+            _apply(touched[start:start + batch_size], gained, likes)
+
+        # Deleting a row would lose likes_seen and count every old like as
+        # new on the next run, so only rows without a baseline are deleted
+        faded = TrendingScore.objects.filter(score__lt=config['MIN_SCORE'])
+        faded.filter(likes_seen=0).delete()
+        faded.filter(score__gt=0).update(score=0)
+
+        if last_run:
+            last_run.computed_at = now
+            last_run.save(update_fields=['computed_at'])
+        else:
+            TrendingRun.objects.create(computed_at=now)
+
+        transaction.on_commit(lambda: bump_version(LIST_NAMESPACE))
+
+    return len(gained)
+
+
+def _apply(story_ids, gained, likes):
+    existing = TrendingScore.objects.in_bulk(story_ids)
+    updated, created = [], []
+    for story_id in story_ids:
+        row = existing.get(story_id)
+        if row is None:
+            row = TrendingScore(story_id=story_id)
+            created.append(row)
+        else:
+            updated.append(row)
+        row.score += gained.get(story_id, 0.0)
+        if story_id in likes:
+            row.likes_seen = likes[story_id]
+
+    TrendingScore.objects.bulk_create(created)
+    TrendingScore.objects.bulk_update(updated, ['score', 'likes_seen'])
@@ -4,7 +4,12 @@ from . import views
 urlpatterns = [
     # Story URLs
     path('stories/', views.StoryListCreateView.as_view(), name='story-list'),
+    # Collection routes shadow story slugs; keep models.RESERVED_SLUGS in step
+    path('stories/feed/', views.FollowingFeedView.as_view(), name='story-feed'),
+    path('stories/trending/', views.TrendingStoriesView.as_view(), name='story-trending'),
+    path('stories/search/', views.StorySearchView.as_view(), name='story-search'),
     path('stories/<slug:slug>/', views.StoryDetailView.as_view(), name='story-detail'),
+    path('stories/<slug:slug>/tree/', views.StoryTreeView.as_view(), name='story-tree'),
     path('stories/<slug:slug>/like/', views.StoryLikeView.as_view(), name='story-like'),
     path('stories/<slug:slug>/share/', views.StoryShareView.as_view(), name='story-share'),
     path('stories/<slug:slug>/stats/', views.StoryStatsView.as_view(), name='story-stats'),
@@ -17,9 +22,15 @@ urlpatterns = [
     path('stories/<slug:story_slug>/chapters/',
          views.ChapterListCreateView.as_view(),
          name='chapter-list'),
+    path('stories/<slug:story_slug>/chapters/bulk/',
+         views.ChapterBulkView.as_view(),
+         name='chapter-bulk'),
     path('stories/<slug:story_slug>/chapters/<int:pk>/',
          views.ChapterDetailView.as_view(),
          name='chapter-detail'),
+    path('stories/<slug:story_slug>/chapters/<int:pk>/content/',
+         views.ChapterContentView.as_view(),
+         name='chapter-content'),
 
     # Decision Point URLs
     path('stories/<slug:story_slug>/chapters/<int:chapter_pk>/decision-points/',
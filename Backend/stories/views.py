@@ -2,23 +2,120 @@ from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q
-from django.db import models
-from .models import Story, Chapter, DecisionPoint, Choice, Vote, StoryShare
+from django.utils import timezone
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Length, Substr
+from django.db import IntegrityError, models, transaction
+from .models import Story, Chapter, DecisionPoint, Choice, Vote, StoryShare, TrendingScore
 from .serializers import (
-    StorySerializer, ChapterSerializer,
+    EXCERPT_LENGTH, StorySummarySerializer, StorySearchResultSerializer, StorySerializer,
+    StoryTreeSerializer, ChapterSerializer, ChapterSummarySerializer, ChapterContentSerializer, ChapterBulkSerializer,
     DecisionPointSerializer, ChoiceSerializer, VoteSerializer, StoryShareSerializer
 )
-from rest_framework.exceptions import PermissionDenied
-
-class StoryListCreateView(generics.ListCreateAPIView):
+from . import feed, search, tasks
+from .cache import CachedResponseMixin, CachedStoryResponseMixin, ConditionalGetMixin, invalidate_story
+from .pagination import StoryCursorPagination, StoryShareCursorPagination
+from .realtime import tally_broadcaster
+from .vote_buffer import vote_buffer
+from rest_framework.exceptions import PermissionDenied, ValidationError
+
+def story_summaries(queryset):
+    """Restrict a story queryset to the columns StorySummarySerializer needs"""
+    chapters_count = Chapter.objects.filter(
+        story=OuterRef('pk')
+    ).order_by().values('story').annotate(n=Count('pk')).values('n')
+
+    return queryset.select_related('author').only(
+        'id', 'title', 'slug', 'cover_image', 'cover_thumbnail', 'category', 'author_id',
+        'created_at', 'likes_count', 'shares_count', 'author__username'
+    ).annotate(
+        excerpt=Substr('description', 1, EXCERPT_LENGTH),
+        chapters_count=Coalesce(Subquery(chapters_count, output_field=IntegerField()), 0)
+    )
+
+def decision_point_tree(active_only=False):
+    """Prefetch a chapter's decision points with their choices"""
+    decision_points = DecisionPoint.objects.order_by('-created_at')
+    if active_only:
+        decision_points = decision_points.filter(is_active=True)
+
+    return Prefetch(
+        'decision_points',
+        queryset=decision_points.prefetch_related(
+            Prefetch('choices', queryset=Choice.objects.order_by('id'))
+        )
+    )
+
+def chapter_outlines(queryset, active_only=False):
+    """Defer chapter bodies and prefetch each chapter's decision points and choices
+
+    Listings only report the body's length; readers fetch one chapter's
+    text at a time from the content endpoint.
+    """
+    return queryset.defer('content').annotate(
+        content_length=Length('content')
+    ).prefetch_related(decision_point_tree(active_only))
+
+def chapter_tree(active_only=False):
+    """Prefetch a story's chapter outlines with their decision points and choices
+
+    Loads the whole chapter -> decision point -> choice tree in one query
+    per level, however many chapters the story has.
+    """
+    return Prefetch(
+        'chapters',
+        queryset=chapter_outlines(Chapter.objects.order_by('order'), active_only)
+    )
+
+class ViewerStateMixin:
+    """Resolve the current user's likes and shares for a whole page of stories
+
+    The sets are passed to the serializer context so `is_liked` and
+    `is_shared` become set lookups instead of a query per story.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context'].update(self.get_viewer_state(args[0]))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_viewer_state(self, stories):
+        user = self.request.user
+        if not user.is_authenticated:
+            return {}
+
+        story_ids = [story.pk for story in stories]
+        return {
+            'liked_story_ids': set(
+                Story.likes.through.objects.filter(
+                    user=user,
+                    story_id__in=story_ids
+                ).values_list('story_id', flat=True)
+            ),
+            'shared_story_ids': set(
+                StoryShare.objects.filter(
+                    shared_by=user,
+                    story_id__in=story_ids
+                ).values_list('story_id', flat=True)
+            ),
+        }
+
+class StoryListCreateView(CachedResponseMixin, ViewerStateMixin, generics.ListCreateAPIView):
     """List and create stories with filtering and search"""
-    serializer_class = StorySerializer
+    serializer_class = StorySummarySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = StoryCursorPagination
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return StorySerializer
+        return self.serializer_class
 
     def get_queryset(self):
-        queryset = Story.objects.filter(is_published=True).select_related('author').prefetch_related('likes', 'shares').order_by('-created_at')
+        queryset = story_summaries(Story.objects.filter(is_published=True)).order_by('-created_at', '-id')
 
         # Filter by author if provided
         author = self.request.query_params.get('author', None)
@@ -30,22 +127,85 @@ class StoryListCreateView(generics.ListCreateAPIView):
         if category:
             queryset = queryset.filter(category=category)
 
-        # Search by title or description
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
-            )
+        # Full-text search over title, description, content and chapters
+        query = self.request.query_params.get('search', None)
+        if query:
+            queryset = search.get_backend().filter(queryset, query)
 
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class StoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LimitMixin:
+    """Return the top `limit` results instead of paginating"""
+    pagination_class = None
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+class StorySearchView(LimitMixin, ViewerStateMixin, generics.ListAPIView):
+    """Ranked full-text search over published stories with highlighted snippets"""
+    serializer_class = StorySearchResultSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Search query is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Over-fetch a little so unpublished matches don't shrink the page
+        limit = self.get_limit()
+        hits = search.get_backend().search(query, limit * 2)
+        ranking = {
+            story_id: (rank, search.render_snippet(snippet))
+            for story_id, rank, snippet in hits
+        }
+
+        stories = story_summaries(Story.objects.filter(pk__in=ranking, is_published=True))
+        stories = sorted(stories, key=lambda story: ranking[story.pk][0], reverse=True)[:limit]
+
+        context = {**self.get_serializer_context(), 'search_ranking': ranking}
+        serializer = self.get_serializer(stories, many=True, context=context)
+        return Response(serializer.data)
+
+class TrendingStoriesView(LimitMixin, CachedResponseMixin, ViewerStateMixin, generics.ListAPIView):
+    """Published stories ranked by their time-decayed trending score"""
+    serializer_class = StorySummarySerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        # Walk the score index first, then load just those stories
+        story_ids = list(
+            TrendingScore.objects.filter(
+                score__gt=0, story__is_published=True
+            ).order_by('-score').values_list('story_id', flat=True)[:self.get_limit()]
+        )
+        stories = story_summaries(Story.objects.filter(pk__in=story_ids)).in_bulk()
+        return [stories[story_id] for story_id in story_ids if story_id in stories]
+
+class FollowingFeedView(ViewerStateMixin, generics.ListAPIView):
+    """Stories from the authors the current user follows, newest first"""
+    serializer_class = StorySummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = feed.FollowingFeedPagination
+
+    def get_queryset(self):
+        # Stories are loaded by primary key once the page's keys are known
+        return story_summaries(Story.objects.filter(is_published=True))
+
+class StoryDetailView(ConditionalGetMixin, CachedStoryResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a story"""
-    queryset = Story.objects.filter(is_published=True).select_related('author').prefetch_related('likes', 'shares', 'chapters')
+    queryset = Story.objects.filter(is_published=True).select_related('author').prefetch_related(chapter_tree())
     serializer_class = StorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
@@ -54,34 +214,86 @@ class StoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         if serializer.instance.author != self.request.user:
             raise PermissionDenied("You can only edit your own stories")
         serializer.save()
+        # The update drops the instance's prefetched chapters; reload them
+        # so the response doesn't query each chapter's decision points.
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
 
     def perform_destroy(self, instance):
         if instance.author != self.request.user:
             raise PermissionDenied("You can only delete your own stories")
         instance.delete()
 
-class StoryLikeView(APIView):
-    """Like or unlike a story"""
-    permission_classes = [permissions.IsAuthenticated]
+class StoryTreeView(CachedStoryResponseMixin, generics.RetrieveAPIView):
+    """Read a story's full chapter -> decision point -> choice tree"""
+    queryset = Story.objects.filter(is_published=True).select_related('author').prefetch_related(
+        chapter_tree(active_only=True)
+    )
+    serializer_class = StoryTreeSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    lookup_field = 'slug'
 
-    def post(self, request, slug):
-        story = get_object_or_404(Story, slug=slug, is_published=True)
+class StoryLikeView(APIView):
+    """Like or unlike a story
 
-        if request.user in story.likes.all():
-            story.likes.remove(request.user)
-            return Response({
-                "message": "Story unliked",
-                "liked": False,
-                "likes_count": story.likes_count
-            }, status=status.HTTP_200_OK)
+    PUT likes and DELETE unlikes; both are idempotent. POST toggles, for
+    existing clients. Each is a single insert or delete on the likes table
+    plus an F() update of the stored counter.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        story.likes.add(request.user)
+    def get_story_id(self, slug):
+        story_id = Story.objects.filter(slug=slug, is_published=True).values_list('pk', flat=True).first()
+        if story_id is None:
+            raise Http404("No Story matches the given query.")
+        return story_id
+
+    def add_like(self, story_id, user):
+        """Insert the like, relying on the through table's unique constraint"""
+        try:
+            with transaction.atomic():
+                Story.likes.through.objects.create(story_id=story_id, user_id=user.pk)
+                Story.objects.filter(pk=story_id).touch(likes_count=F('likes_count') + 1)
+        except IntegrityError:
+            return False
+        return True
+
+    def remove_like(self, story_id, user):
+        with transaction.atomic():
+            removed, _ = Story.likes.through.objects.filter(story_id=story_id, user_id=user.pk).delete()
+            # A like the counter never saw (one predating the column, say)
+            # would take it below zero; recount instead
+            if removed and not Story.objects.filter(pk=story_id, likes_count__gte=removed).touch(
+                likes_count=F('likes_count') - removed
+            ):
+                Story.objects.filter(pk=story_id).recount_likes()
+        return bool(removed)
+
+    def like_response(self, slug, story_id, liked, changed):
+        if changed:
+            invalidate_story(slug, lists=False)
         return Response({
-            "message": "Story liked",
-            "liked": True,
-            "likes_count": story.likes_count
+            "message": "Story liked" if liked else "Story unliked",
+            "liked": liked,
+            "likes_count": Story.objects.filter(pk=story_id).values_list('likes_count', flat=True).get()
         }, status=status.HTTP_200_OK)
 
+    def put(self, request, slug):
+        story_id = self.get_story_id(slug)
+        changed = self.add_like(story_id, request.user)
+        return self.like_response(slug, story_id, True, changed)
+
+    def delete(self, request, slug):
+        story_id = self.get_story_id(slug)
+        changed = self.remove_like(story_id, request.user)
+        return self.like_response(slug, story_id, False, changed)
+
+    def post(self, request, slug):
+        story_id = self.get_story_id(slug)
+        if self.add_like(story_id, request.user):
+            return self.like_response(slug, story_id, True, True)
+        self.remove_like(story_id, request.user)
+        return self.like_response(slug, story_id, False, True)
+
 class StoryShareView(APIView):
     """Share a story on social platforms"""
     permission_classes = [permissions.IsAuthenticated]
@@ -103,11 +315,16 @@ class StoryShareView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        share, created = StoryShare.objects.get_or_create(
-            story=story,
-            shared_by=request.user,
-            platform=platform
-        )
+        with transaction.atomic():
+            share, created = StoryShare.objects.get_or_create(
+                story=story,
+                shared_by=request.user,
+                platform=platform
+            )
+            if created:
+                Story.objects.filter(pk=story.pk).touch(shares_count=F('shares_count') + 1)
+
+        story.refresh_from_db(fields=['shares_count'])
 
         if created:
             return Response({
@@ -122,14 +339,19 @@ class StoryShareView(APIView):
             "shares_count": story.shares_count
         }, status=status.HTTP_200_OK)
 
-class ChapterListCreateView(generics.ListCreateAPIView):
-    """List and create chapters for a story"""
-    serializer_class = ChapterSerializer
+class ChapterListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
+    """List chapter metadata and create chapters for a story"""
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    story_slug_url_kwarg = 'story_slug'
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return ChapterSerializer
+        return ChapterSummarySerializer
 
     def get_queryset(self):
         story_slug = self.kwargs['story_slug']
-        return Chapter.objects.filter(story__slug=story_slug).order_by('order')
+        return chapter_outlines(Chapter.objects.filter(story__slug=story_slug).order_by('order'))
 
     def perform_create(self, serializer):
         story = get_object_or_404(Story, slug=self.kwargs['story_slug'], is_published=True)
@@ -140,14 +362,104 @@ class ChapterListCreateView(generics.ListCreateAPIView):
             )
         serializer.save(story=story)
 
-class ChapterDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ChapterBulkView(APIView):
+    """Create, update and reorder many chapters of a story in one request
+
+    Entries with an ``id`` update that chapter and the others create one;
+    chapters left out keep their place. Final orders must be unique across
+    the story. Moved chapters are first parked on temporary negative orders
+    so that swaps and shifts never trip the (story, order) constraint, then
+    everything is written with a few bulk_update and bulk_create queries in
+    one transaction. Bulk writes skip model signals, so the story is
+    reindexed and its cache invalidated once at the end.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, story_slug):
+        story = get_object_or_404(
+            Story.objects.only('id', 'slug', 'author_id'), slug=story_slug, is_published=True
+        )
+        if story.author_id != request.user.pk:
+            raise PermissionDenied("You can only edit chapters of your own stories")
+
+        serializer = ChapterBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['chapters']
+
+        with transaction.atomic():
+            # Bodies aren't loaded; only the fields being changed are written
+            existing = {
+                chapter.pk: chapter
+                for chapter in Chapter.objects.select_for_update().filter(story=story).only('id', 'story_id', 'order')
+            }
+            self.check_orders(items, existing)
+
+            now = timezone.now()
+            updates = [(existing[item['id']], item) for item in items if 'id' in item]
+            moved = [chapter for chapter, item in updates if item.get('order', chapter.order) != chapter.order]
+            if moved:
+                orders = [chapter.order for chapter in existing.values()]
+                orders += [item['order'] for item in items if 'order' in item]
+                floor = min(0, *orders) - 1
+                for offset, chapter in enumerate(moved):
+                    chapter.order = floor - offset
+                Chapter.objects.bulk_update(moved, ['order'])
+
+            # One bulk_update per combination of changed fields
+            groups = {}
+            for chapter, item in updates:
+                fields = tuple(name for name in ('title', 'content', 'order') if name in item)
+                if fields:
+                    for name in fields:
+                        setattr(chapter, name, item[name])
+                    chapter.updated_at = now
+                    groups.setdefault(fields, []).append(chapter)
+            for fields, chapters in groups.items():
+                Chapter.objects.bulk_update(chapters, [*fields, 'updated_at'])
+
+            Chapter.objects.bulk_create([
+                Chapter(story=story, title=item['title'], content=item['content'], order=item['order'])
+                for item in items if 'id' not in item
+            ])
+            Story.objects.filter(pk=story.pk).touch()
+            tasks.index_stories.enqueue([story.pk])
+
+        invalidate_story(story.slug)
+        chapters = chapter_outlines(Chapter.objects.filter(story=story).order_by('order'))
+        return Response(ChapterSummarySerializer(chapters, many=True).data, status=status.HTTP_200_OK)
+
+    def check_orders(self, items, existing):
+        unknown = sorted({item['id'] for item in items if 'id' in item} - existing.keys())
+        if unknown:
+            raise ValidationError({'chapters': [f"Unknown chapter ids: {', '.join(map(str, unknown))}"]})
+
+        orders = {pk: chapter.order for pk, chapter in existing.items()}
+        orders.update((item['id'], item['order']) for item in items if 'id' in item and 'order' in item)
+        final = [*orders.values(), *(item['order'] for item in items if 'id' not in item)]
+        if len(final) != len(set(final)):
+            raise ValidationError({'chapters': ["Chapter orders must be unique within the story."]})
+
+class ChapterContentView(ConditionalGetMixin, CachedStoryResponseMixin, generics.RetrieveAPIView):
+    """Read the body of a single chapter"""
+    serializer_class = ChapterContentSerializer
+    permission_classes = [permissions.AllowAny]
+    story_slug_url_kwarg = 'story_slug'
+
+    def get_queryset(self):
+        return Chapter.objects.filter(
+            story__slug=self.kwargs['story_slug'],
+            story__is_published=True
+        ).only('id', 'title', 'order', 'content', 'updated_at')
+
+class ChapterDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a chapter"""
     serializer_class = ChapterSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    story_slug_url_kwarg = 'story_slug'
 
     def get_queryset(self):
         story_slug = self.kwargs['story_slug']
-        return Chapter.objects.filter(story__slug=story_slug)
+        return Chapter.objects.filter(story__slug=story_slug).prefetch_related(decision_point_tree())
 
     def perform_update(self, serializer):
         chapter = self.get_object()
@@ -246,53 +558,102 @@ class VoteCreateView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        choice = get_object_or_404(Choice, id=choice_id)
+        choice = get_object_or_404(
+            Choice.objects.select_related('decision_point'),
+            id=choice_id,
+            decision_point_id=self.kwargs['decision_point_pk'],
+            decision_point__chapter_id=self.kwargs['chapter_pk'],
+            decision_point__chapter__story__slug=self.kwargs['story_slug']
+        )
 
-        # Check if user already voted on this decision point
-        if Vote.objects.filter(
-            user=request.user,
-            choice__decision_point=choice.decision_point
-        ).exists():
+        # Check if decision point is still active
+        if not choice.decision_point.is_active:
             return Response(
-                {"error": "You have already voted on this decision point"},
+                {"error": "This decision point is no longer active"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check if decision point is still active
-        if not choice.decision_point.is_active:
+        if vote_buffer.enabled:
+            return self.create_buffered(request, choice)
+
+        # One vote per user per decision point is enforced by the unique
+        # constraint on Vote, so concurrent duplicates fail on insert. The
+        # tally is locked first so a buffered flush of the same choice
+        # either sees this vote or makes it fail (see vote_buffer._write).
+        try:
+            with transaction.atomic():
+                Choice.objects.filter(pk=choice.pk).update(votes=F('votes') + 1)
+                vote = Vote.objects.create(
+                    user=request.user,
+                    choice=choice,
+                    decision_point=choice.decision_point
+                )
+        except IntegrityError:
             return Response(
-                {"error": "This decision point is no longer active"},
+                {"error": "You have already voted on this decision point"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        invalidate_story(self.kwargs['story_slug'], lists=False)
+        transaction.on_commit(lambda: tally_broadcaster.schedule(choice.decision_point_id))
 
-        # Update vote count
-        choice.votes += 1
-        choice.save()
+        tallies = {
+            choice_pk: votes
+            for choice_pk, votes in Choice.objects.filter(
+                decision_point_id=choice.decision_point_id
+            ).values_list('id', 'votes')
+        }
 
         return Response({
-            **serializer.data,
+            **self.get_serializer(vote).data,
             "message": "Vote recorded successfully",
-            "choice_votes": choice.votes
+            "choice_votes": tallies[choice.pk],
+            "tallies": tallies
         }, status=status.HTTP_201_CREATED)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def create_buffered(self, request, choice):
+        """Queue the vote in the write buffer and answer before it is flushed"""
+        decision_point_id = choice.decision_point_id
+        if (
+            vote_buffer.has_vote(request.user.id, decision_point_id) or
+            Vote.objects.filter(user=request.user, decision_point_id=decision_point_id).exists() or
+            not vote_buffer.add(request.user.id, choice.pk, decision_point_id)
+        ):
+            return Response(
+                {"error": "You have already voted on this decision point"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        invalidate_story(self.kwargs['story_slug'], lists=False)
+        transaction.on_commit(lambda: tally_broadcaster.schedule(decision_point_id))
+
+        tallies = vote_buffer.merge_tallies({
+            choice_pk: votes
+            for choice_pk, votes in Choice.objects.filter(
+                decision_point_id=decision_point_id
+            ).values_list('id', 'votes')
+        })
 
-class UserStoriesView(generics.ListAPIView):
+        return Response({
+            "choice": choice.pk,
+            "decision_point": decision_point_id,
+            "message": "Vote accepted",
+            "choice_votes": tallies[choice.pk],
+            "tallies": tallies
+        }, status=status.HTTP_202_ACCEPTED)
+
+class UserStoriesView(CachedResponseMixin, ViewerStateMixin, generics.ListAPIView):
     """Get stories by a specific user"""
-    serializer_class = StorySerializer
+    serializer_class = StorySummarySerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = StoryCursorPagination
 
     def get_queryset(self):
         username = self.kwargs['username']
-        return Story.objects.filter(
+        return story_summaries(Story.objects.filter(
             author__username=username,
             is_published=True
-        ).select_related('author').prefetch_related('likes', 'shares').order_by('-created_at')
+        )).order_by('-created_at', '-id')
 
 class StoryStatsView(generics.RetrieveAPIView):
     """Get detailed statistics for a story"""
@@ -300,10 +661,14 @@ class StoryStatsView(generics.RetrieveAPIView):
     serializer_class = StorySerializer
 
     def get_object(self):
-        story = get_object_or_404(Story, slug=self.kwargs['slug'], is_published=True)
+        story = get_object_or_404(
+            Story.objects.select_related('author').prefetch_related(chapter_tree()),
+            slug=self.kwargs['slug'],
+            is_published=True
+        )
 
         # Only author can see detailed stats
-        if story.author != self.request.user:
+        if story.author_id != self.request.user.id:
             raise PermissionDenied("You can only view stats for your own stories")
 
         return story
@@ -312,12 +677,13 @@ class StorySharesView(generics.ListAPIView):
     """Get all shares for a story"""
     serializer_class = StoryShareSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StoryShareCursorPagination
 
     def get_queryset(self):
         story = get_object_or_404(Story, slug=self.kwargs['slug'])
 
         # Only author can see shares
-        if story.author != self.request.user:
+        if story.author_id != self.request.user.id:
             raise PermissionDenied("You can only view shares for your own stories")
 
-        return StoryShare.objects.filter(story=story).order_by('-shared_at')
\ No newline at end of file
+        return StoryShare.objects.filter(story=story).select_related('story', 'shared_by').order_by('-shared_at', '-id')
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+In-process write buffer for vote ingestion on busy decision points.
+
+When ``STORIES_VOTE_BUFFER['ENABLED']`` is set, ``VoteCreateView`` hands votes
+to the module-level ``vote_buffer`` instead of writing them one transaction at
+a time. The buffer is flushed every ``FLUSH_INTERVAL`` seconds, or as soon as
+``MAX_PENDING`` votes are waiting, with a single ``bulk_create`` and an
+``F()`` increment per distinct batch count, so a flush costs the same however
+many votes the choices already hold. Only if the insert lost a vote to a
+concurrent direct one are the touched tallies recounted. Pending counts are
+merged into reads so a voter sees their vote before it reaches the database.
+
+Votes for choices deleted while they were buffered are dropped at flush time.
+A batch that fails to write is retried up to ``MAX_RETRIES`` more times, after
+which its votes are logged and discarded so they cannot hold back later ones.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Choice, Story, Vote
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_PENDING': 500,
+    'MAX_RETRIES': 3,
+}
+
+
+def buffer_settings():
+    return {**DEFAULTS, **getattr(settings, 'STORIES_VOTE_BUFFER', {})}
+
+
+class VoteBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # (user_id, decision_point_id) -> choice_id
+        self._pending = {}
+        self._inflight = {}
+        # choice_id -> votes not yet written to Choice.votes
+        self._counts = Counter()
+        # (user_id, decision_point_id) -> failed flushes so far
+        self._failures = Counter()
+        self._timer = None
+
+    @property
+    def enabled(self):
+        return buffer_settings()['ENABLED']
+
+    def add(self, user_id, choice_id, decision_point_id):
+        """Queue a vote; returns False if the user already has one buffered"""
+        key = (user_id, decision_point_id)
+        with self._lock:
+            if key in self._pending or key in self._inflight:
+                return False
+            self._pending[key] = choice_id
+            self._counts[choice_id] += 1
+            pending = len(self._pending)
+            self._schedule_flush()
+
+        if pending >= buffer_settings()['MAX_PENDING']:
+            self.flush()
+        return True
+
+    def has_vote(self, user_id, decision_point_id):
+        key = (user_id, decision_point_id)
+        with self._lock:
+            return key in self._pending or key in self._inflight
+
+    def pending_votes(self, choice_id):
+        with self._lock:
+            return self._counts.get(choice_id, 0)
+
+    def merge_tallies(self, tallies):
+        """Add buffered votes to a ``{choice_id: votes}`` mapping"""
+        with self._lock:
+            return {
+                choice_id: votes + self._counts.get(choice_id, 0)
+                for choice_id, votes in tallies.items()
+            }
+
+    def flush(self):
+        """Write buffered votes to the database; returns the number sent for insert
+
+        A buffered vote that lost a race with one written directly for the
+        same user and decision point is skipped by the insert, as is one whose
+        choice has since been deleted.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+
+            try:
+                written = self._write(batch)
+            except Exception:
+                logger.exception("Failed to flush %d buffered votes", len(batch))
+                max_retries = buffer_settings()['MAX_RETRIES']
+                with self._lock:
+                    # Put the batch back so the next flush retries it, unless
+                    # it has already failed too often to be worth keeping.
+                    dropped = {}
+                    for key, choice_id in batch.items():
+                        self._failures[key] += 1
+                        if self._failures[key] > max_retries:
+                            del self._failures[key]
+                            dropped[key] = choice_id
+                        else:
+                            self._pending.setdefault(key, choice_id)
+                    self._discard(dropped)
+                    self._inflight = {}
+                    if self._pending:
+                        self._schedule_flush()
+                if dropped:
+                    logger.error(
+                        "Dropped %d buffered votes after %d failed flushes: %r",
+                        len(dropped), max_retries + 1, dropped
+                    )
+                return 0
+
+            with self._lock:
+                self._discard(batch)
+                self._inflight = {}
+            return written
+
+    def _discard(self, batch):
+        # Called with self._lock held
+        self._counts.subtract(Counter(batch.values()))
+        self._counts = +self._counts
+        for key in batch:
+            self._failures.pop(key, None)
+
+    def _write(self, batch):
+        user_ids = {user_id for user_id, _ in batch}
+        decision_point_ids = {decision_point_id for _, decision_point_id in batch}
+
+        with transaction.atomic():
+            # Lock the tallies before looking for existing votes. A direct
+            # vote increments its choice before inserting (see
+            # VoteCreateView), so one for any of these choices has either
+            # committed and shows up below, or waits for this flush and then
+            # fails on the unique constraint. The lock also keeps the choices
+            # from being deleted under the insert; votes for ones already
+            # gone are dropped.
+            choices = Choice.objects.filter(pk__in=set(batch.values()))
+            live_choice_ids = set(choices.select_for_update().values_list('pk', flat=True))
+            existing = set(
+                Vote.objects.filter(
+                    user_id__in=user_ids,
+                    decision_point_id__in=decision_point_ids
+                ).values_list('user_id', 'decision_point_id')
+            )
+            new_votes = [
+                Vote(user_id=user_id, decision_point_id=decision_point_id, choice_id=choice_id)
+                for (user_id, decision_point_id), choice_id in batch.items()
+                if (user_id, decision_point_id) not in existing
+            ]
+            stale = [vote for vote in new_votes if vote.choice_id not in live_choice_ids]
+            if stale:
+                logger.warning("Dropping %d buffered votes for deleted choices", len(stale))
+                new_votes = [vote for vote in new_votes if vote.choice_id in live_choice_ids]
+            if not new_votes:
+                return 0
+
+            Vote.objects.bulk_create(new_votes, batch_size=500, ignore_conflicts=True)
+
+            # ignore_conflicts drops silently a vote that lost its (user,
+            # decision point) to a direct vote for another choice, which the
+            # lock doesn't cover; check what the insert kept
+            stored = set(
+                Vote.objects.filter(
+                    user_id__in={vote.user_id for vote in new_votes},
+                    decision_point_id__in={vote.decision_point_id for vote in new_votes}
+                ).values_list('user_id', 'decision_point_id', 'choice_id')
+            )
+            inserted = Counter(
+                vote.choice_id for vote in new_votes
+                if (vote.user_id, vote.decision_point_id, vote.choice_id) in stored
+            )
+            if sum(inserted.values()) == len(new_votes):
+                by_count = defaultdict(list)
+                for choice_id, n in inserted.items():
+                    by_count[n].append(choice_id)
+                for n, choice_ids in by_count.items():
+                    Choice.objects.filter(pk__in=choice_ids).update(votes=F('votes') + n)
+            else:
+                tallies = Vote.objects.filter(
+                    choice=OuterRef('pk')
+                ).order_by().values('choice').annotate(n=Count('pk'))
+                Choice.objects.filter(pk__in={vote.choice_id for vote in new_votes}).update(
+                    votes=Coalesce(Subquery(tallies.values('n'), output_field=IntegerField()), 0)
+                )
+
+        # Once per flush and outside the transaction, so votes never queue
+        # on the story rows; see stories/realtime.py
+        Story.objects.filter(
+            chapters__decision_points__in={vote.decision_point_id for vote in new_votes}
+        ).touch()
+        return len(new_votes)
+
+    def _schedule_flush(self):
+        interval = buffer_settings()['FLUSH_INTERVAL']
+        if self._timer is not None or interval is None:
+            return
+        self._timer = threading.Timer(interval, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self):
+        # Timer threads are outside the request cycle, so nothing else
+        # closes the connection they open
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+vote_buffer = VoteBuffer()
+atexit.register(vote_buffer.flush)
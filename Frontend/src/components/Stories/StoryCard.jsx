@@ -16,14 +16,16 @@ const StoryCard = ({ story, viewMode = 'grid' }) => {
     id,
     title,
     slug,
-    description,
+    excerpt,
+    description = excerpt,
     author_username,
     created_at,
     likes_count,
     shares_count,
     is_liked,
     cover_image,
-    chapters
+    chapters,
+    chapters_count = chapters?.length
   } = story
 
   if (viewMode === 'list') {
@@ -89,10 +91,10 @@ const StoryCard = ({ story, viewMode = 'grid' }) => {
                     <Share2 className="h-4 w-4" />
                     <span>{shares_count || 0}</span>
                   </div>
-                  {chapters?.length > 0 && (
+                  {chapters_count > 0 && (
                     <div className="flex items-center space-x-1">
                       <Eye className="h-4 w-4" />
-                      <span>{chapters.length}</span>
+                      <span>{chapters_count}</span>
                     </div>
                   )}
                 </div>
@@ -136,10 +138,10 @@ const StoryCard = ({ story, viewMode = 'grid' }) => {
               <Share2 className="h-4 w-4" />
               <span>{shares_count || 0}</span>
             </div>
-            {chapters?.length > 0 && (
+            {chapters_count > 0 && (
               <div className="flex items-center space-x-1">
                 <Eye className="h-4 w-4" />
-                <span>{chapters.length} chapters</span>
+                <span>{chapters_count} chapters</span>
               </div>
             )}
           </div>
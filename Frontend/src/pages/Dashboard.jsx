@@ -40,7 +40,7 @@ const Dashboard = () => {
   // Calculate stats
   const totalLikes = userStories?.reduce((sum, story) => sum + (story.likes_count || 0), 0) || 0
   const totalShares = userStories?.reduce((sum, story) => sum + (story.shares_count || 0), 0) || 0
-  const totalChapters = userStories?.reduce((sum, story) => sum + (story.chapters?.length || 0), 0) || 0
+  const totalChapters = userStories?.reduce((sum, story) => sum + (story.chapters_count || 0), 0) || 0
 
   const stats = [
     {
@@ -308,7 +308,7 @@ const Dashboard = () => {
                             </span>
                             <span className="flex items-center space-x-1">
                               <BookOpen className="h-4 w-4" />
-                              <span>{story.chapters?.length || 0} chapters</span>
+                              <span>{story.chapters_count || 0} chapters</span>
                             </span>
                             <span className="flex items-center space-x-1">
                               <Calendar className="h-4 w-4" />
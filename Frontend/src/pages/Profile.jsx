@@ -146,7 +146,7 @@ const Profile = () => {
               <div className="w-24 h-24 md:w-32 md:h-32 rounded-full bg-gradient-to-r from-primary-500 to-secondary-500 flex items-center justify-center text-white text-3xl md:text-4xl font-bold">
                 {profile.avatar ? (
                   <img
-                    src={profile.avatar}
+                    src={profile.avatar_medium || profile.avatar}
                     alt={profile.username}
                     className="w-full h-full rounded-full object-cover"
                   />
@@ -152,7 +152,7 @@ const StoryDetail = () => {
           {story.cover_image && (
             <div className="relative h-64 md:h-80 mb-6 rounded-lg overflow-hidden">
               <img
-                src={story.cover_image}
+                src={story.cover_medium || story.cover_image}
                 alt={story.title}
                 className="w-full h-full object-cover"
               />
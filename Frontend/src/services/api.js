@@ -70,6 +70,7 @@ export const profileAPI = {
   updateProfile: (data) => api.patch('/profile/update/', data),
   followUser: (username) => api.post(`/follow/${username}/`),
   unfollowUser: (username) => api.post(`/unfollow/${username}/`),
+  getFollowState: (usernames) => api.post('/follow-state/', { usernames }),
   getFollowers: async (username) => {
     const data = await api.get(`/profile/${username}/followers/`)
     return data?.results || data
@@ -84,6 +85,10 @@ export const profileAPI = {
 export const storiesAPI = {
   getStories: (params) => api.get('/stories/', { params }),
   getStory: (slug) => api.get(`/stories/${slug}/`),
+  getStoryTree: (slug) => api.get(`/stories/${slug}/tree/`),
+  searchStories: (q, params) => api.get('/stories/search/', { params: { q, ...params } }),
+  getFollowingFeed: (params) => api.get('/stories/feed/', { params }),
+  getTrendingStories: (limit) => api.get('/stories/trending/', { params: { limit } }),
   createStory: (data) => api.post('/stories/', data),
   updateStory: (slug, data) => api.patch(`/stories/${slug}/`, data),
   deleteStory: (slug) => api.delete(`/stories/${slug}/`),
@@ -107,9 +112,12 @@ export const chaptersAPI = {
     return data?.results || data
   },
   getChapter: (storySlug, chapterId) => api.get(`/stories/${storySlug}/chapters/${chapterId}/`),
+  getChapterContent: (storySlug, chapterId) => api.get(`/stories/${storySlug}/chapters/${chapterId}/content/`),
   createChapter: (storySlug, data) => api.post(`/stories/${storySlug}/chapters/`, data),
   updateChapter: (storySlug, chapterId, data) => api.patch(`/stories/${storySlug}/chapters/${chapterId}/`, data),
   deleteChapter: (storySlug, chapterId) => api.delete(`/stories/${storySlug}/chapters/${chapterId}/`),
+  // Entries with an id update or move that chapter; the rest are created
+  bulkSaveChapters: (storySlug, chapters) => api.post(`/stories/${storySlug}/chapters/bulk/`, { chapters }),
 }
 
 // Decision Points API